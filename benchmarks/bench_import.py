@@ -0,0 +1,44 @@
+# coding: utf8
+"""
+Measures the startup time of short-lived scripts, each statement running in a fresh interpreter,
+and lists the heavy dependencies it loaded.
+
+usage: python -m benchmarks.bench_import [runs]
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+ONTO = Path(__file__).parent.parent / "tests" / "resources" / "test_onto_freq.yaml"
+HEAVY = ["openpyxl", "tibetan_sort", "yaml"]
+STATEMENTS = {
+    "import": "import leavedonto",
+    "LeavedOnto": "from leavedonto import LeavedOnto",
+    "OntoManager": "from leavedonto import OntoManager",
+    "load yaml": f"from leavedonto import LeavedOnto; LeavedOnto({str(ONTO)!r}).find_word('ཁྱི་')",
+}
+REPORT = "import sys, time; print(time.perf_counter() - start, *[m for m in {heavy} if m in sys.modules])"
+
+
+def measure(statement, runs):
+    """
+    :return: tuple(<best seconds>, <heavy modules loaded>)
+    """
+    code = f"import time; start = time.perf_counter()\n{statement}\n{REPORT.format(heavy=HEAVY)}"
+    best, loaded = None, []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+        seconds, loaded = float(out[0]), out[1:]
+        best = seconds if best is None else min(best, seconds)
+    return best, loaded
+
+
+def main(runs):
+    print(f"{'statement':<14}{'seconds':>10}   loaded")
+    for name, statement in STATEMENTS.items():
+        seconds, loaded = measure(statement, runs)
+        print(f"{name:<14}{seconds:>10.4f}   {', '.join(loaded)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
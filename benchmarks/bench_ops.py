@@ -0,0 +1,180 @@
+# coding: utf8
+"""
+Measures the time and peak memory of the main operations on synthetic ontos of increasing sizes,
+to make scaling regressions visible.
+
+usage: python -m benchmarks.bench_ops [--per-leaf 10 50 200] [--depth 3] [--branching 4] [--legend-width 5]
+                                      [--only find_word diff_ontos ...] [--no-memory]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from leavedonto import LeavedOnto, OntoManager
+
+from .synthetic import gen_onto, variant, gen_text, write_text, write_master_layout, POS, LEVELS
+
+
+def bench_load_yaml(ctx):
+    return lambda: LeavedOnto(ctx["yaml"])
+
+
+def bench_load_xlsx(ctx):
+    return lambda: LeavedOnto(ctx["xlsx"])
+
+
+def bench_export_yaml(ctx):
+    out_file = ctx["tmp"] / "export.yaml"
+    return lambda: ctx["onto"].convert2yaml(out_file)
+
+
+def bench_export_xlsx(ctx):
+    out_dir = ctx["tmp"] / "export_xlsx"
+    return lambda: ctx["onto"].convert2xlsx(out_dir)
+
+
+def bench_find_word(ctx):
+    lemmas = [entries[0][0] for _, entries in ctx["onto"].ont.iter_leaves()][:100]
+
+    def run():
+        for lemma in lemmas:
+            ctx["onto"].find_word(lemma)
+    return run
+
+
+def bench_find_entries(ctx):
+    prefixes = sorted(ctx["onto"].ont.head.children)
+
+    def run():
+        ctx["onto"].ont.find_entries()
+        for prefix in prefixes:
+            ctx["onto"].ont.find_entries(prefix=prefix)
+    return run
+
+
+def bench_diff_ontos(ctx):
+    om = OntoManager(ctx["yaml"])
+    return lambda: om.diff_ontos(ctx["variant"])
+
+
+def bench_merge_to_onto(ctx):
+    om = OntoManager(ctx["yaml"])
+    return lambda: om.merge_to_onto(ctx["variant"])
+
+
+def bench_batch_merge_to_onto(ctx):
+    in_dir = ctx["tmp"] / "to_merge"
+    in_dir.mkdir(exist_ok=True)
+    for n in range(3):
+        variant(ctx["onto"], seed=n + 1).convert2yaml(in_dir / f"onto{n}.yaml")
+    om = OntoManager(ctx["yaml"])
+    return lambda: om.batch_merge_to_onto(in_dir)
+
+
+def bench_recompose(ctx):
+    master = write_master_layout(ctx["onto"], ctx["tmp"] / "recompose", origins=ctx["params"]["origins"])
+    om = OntoManager(master)
+    return lambda: om.recompose_ontos_from_master(workers=1)
+
+
+def bench_tag_segmented(ctx):
+    om = OntoManager(ctx["yaml"])
+    fields = {"pos": POS, "levels": LEVELS, "l_colors": [], "level": LEVELS[-1]}
+    out_file = ctx["tmp"] / "text_totag.xlsx"
+    return lambda: om.tag_segmented(ctx["text"], out_file=out_file, fields=fields)
+
+
+BENCHMARKS = {
+    "load_yaml": bench_load_yaml,
+    "load_xlsx": bench_load_xlsx,
+    "export_yaml": bench_export_yaml,
+    "export_xlsx": bench_export_xlsx,
+    "find_word": bench_find_word,
+    "find_entries": bench_find_entries,
+    "diff_ontos": bench_diff_ontos,
+    "merge_to_onto": bench_merge_to_onto,
+    "batch_merge_to_onto": bench_batch_merge_to_onto,
+    "recompose": bench_recompose,
+    "tag_segmented": bench_tag_segmented,
+}
+
+
+def prepare(tmp, params):
+    """
+    Generates the synthetic onto of a given size, and writes it as yaml, xlsx and segmented text
+    """
+    onto = gen_onto(**params)
+    onto.ont_path = tmp / "onto.yaml"
+    onto.convert2yaml(onto.ont_path)
+    onto.convert2xlsx(tmp)
+    # merges name the origin of the merged entries after the file of the merged onto
+    variant(onto).convert2yaml(tmp / "variant.yaml")
+    text = tmp / "text_segmented.txt"
+    write_text(gen_text(onto, lines=500), text)
+    return {
+        "tmp": tmp,
+        "params": params,
+        "onto": onto,
+        "yaml": tmp / "onto.yaml",
+        "xlsx": tmp / "onto.xlsx",
+        "variant": LeavedOnto(tmp / "variant.yaml"),
+        "text": text,
+    }
+
+
+def measure(bench, ctx, memory=True):
+    """
+    :return: tuple(<seconds>, <peak MiB>), the peak being None if memory is False
+    """
+    run = bench(ctx)
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        # separate run, tracemalloc slows down the execution
+        run = bench(ctx)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def main(args):
+    names = args.only if args.only else list(BENCHMARKS)
+    print(f"{'benchmark':<22}{'entries':>10}{'seconds':>12}{'peak MiB':>12}")
+    for per_leaf in args.per_leaf:
+        params = dict(depth=args.depth, branching=args.branching, per_leaf=per_leaf,
+                      legend_width=args.legend_width, origins=args.origins, seed=args.seed)
+        entries = args.branching ** args.depth * per_leaf
+        tmp = Path(tempfile.mkdtemp(prefix="leavedonto_bench_"))
+        try:
+            ctx = prepare(tmp, params)
+            for name in names:
+                seconds, peak = measure(BENCHMARKS[name], ctx, memory=not args.no_memory)
+                peak = f"{peak:.1f}" if peak is not None else "-"
+                print(f"{name:<22}{entries:>10}{seconds:>12.4f}{peak:>12}")
+        finally:
+            shutil.rmtree(tmp)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="benchmarks of leavedonto on synthetic ontos")
+    parser.add_argument("--per-leaf", type=int, nargs="+", default=[10, 50, 200], help="entries per leaf, one run per size")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--branching", type=int, default=4)
+    parser.add_argument("--legend-width", type=int, default=5)
+    parser.add_argument("--origins", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS))
+    parser.add_argument("--no-memory", action="store_true", help="only measure time")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,25 @@
+# coding: utf8
+"""
+Measures the sorting of large leaves, as done in LeavedOnto._cleanup()
+
+usage: python -m benchmarks.bench_sort [entries_per_leaf ...]
+"""
+import sys
+from timeit import timeit
+
+from leavedonto.sort_bo_lists import bo_sort_key, entry_sort_key
+
+from .synthetic import gen_leaf
+
+
+def main(sizes):
+    for size in sizes:
+        leaf = gen_leaf(size)
+        bo_sort_key.cache_clear()
+        cold = timeit(lambda: sorted(leaf, key=entry_sort_key), number=1)
+        warm = timeit(lambda: sorted(leaf, key=entry_sort_key), number=5) / 5
+        print(f"{size:>8} entries   cold: {cold:.4f}s   warm: {warm:.4f}s   {bo_sort_key.cache_info()}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,136 @@
+# coding: utf8
+"""
+Deterministic generator of synthetic ontos and segmented texts, shared by the benchmarks.
+The same parameters and seed always produce the same ontos and texts.
+"""
+import random
+from pathlib import Path
+
+from leavedonto import LeavedOnto
+from leavedonto.origins import Origins
+from leavedonto.trie import OntTrie
+
+SYLLABLES = ["ཀ", "ཁ", "ག", "ང", "ཅ", "ཆ", "ཇ", "ཉ", "ཏ", "ཐ", "ད", "ན", "པ", "ཕ", "བ", "མ",
+             "བསྐ", "སྒྲ", "རྒྱ", "བཀྲ", "མཁྱེ", "འགྲོ", "དགེ", "བདེ", "སེམས", "ཆོས", "ལམ", "ཞིང"]
+POS = ["NOUN", "VERB", "ADJ", "ADV", "PART", "PRON", "NUM", "ADP"]
+LEVELS = ["A0", "A1", "A2"]
+LEGEND = ["word", "POS", "level", "freq", "origin"]
+
+
+def gen_lemma(rnd, max_syls=4):
+    return "་".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(1, max_syls))) + "་"
+
+
+def gen_leaf(size, seed=0):
+    """
+    A list of entries with 6 fields, the level and freq being in the 5th and 6th ones
+    """
+    rnd = random.Random(seed)
+    leaf = []
+    for _ in range(size):
+        leaf.append([gen_lemma(rnd), "", "", "", rnd.choice(LEVELS), str(rnd.randint(1, 50))])
+    return leaf
+
+
+def gen_legend(width=5):
+    if width < len(LEGEND):
+        raise ValueError(f"the legend should have at least {len(LEGEND)} fields: {LEGEND}")
+    return LEGEND + [f"field{n}" for n in range(len(LEGEND), width)]
+
+
+def gen_paths(depth=3, branching=4):
+    """
+    All the leaf paths of a tree of the given depth. Top-level categories are POS tags.
+    """
+    paths = [[pos] for pos in POS[:branching]]
+    for d in range(1, depth):
+        paths = [path + [f"cat{d}_{b}"] for path in paths for b in range(branching)]
+    return paths
+
+
+def gen_trie(depth=3, branching=4, per_leaf=50, legend_width=5, origins=4, seed=0):
+    """
+    :param origins: number of base-level ontos the entries come from (text0, text1, ...)
+    :return: OntTrie of branching ** depth leaves of per_leaf entries each
+    """
+    rnd = random.Random(seed)
+    trie = OntTrie()
+    trie.legend = gen_legend(legend_width)
+    extra = legend_width - len(LEGEND)
+
+    for path in gen_paths(depth, branching):
+        entries = []
+        for _ in range(per_leaf):
+            orig = Origins({f"text{o}": rnd.randint(1, 20) for o in rnd.sample(range(origins), rnd.randint(1, min(2, origins)))})
+            entry = [gen_lemma(rnd), path[0], rnd.choice(LEVELS), orig.freq, orig]
+            entries.append(entry + [gen_lemma(rnd, 2) for _ in range(extra)])
+        trie.add_entries(path, entries)
+    return trie
+
+
+def gen_onto(seed=0, **params):
+    """
+    :return: cleaned up LeavedOnto, see gen_trie() for the parameters
+    """
+    return LeavedOnto(gen_trie(seed=seed, **params))
+
+
+def variant(onto, changed=0.1, seed=1):
+    """
+    A copy of onto where a fraction of the entries is replaced by new ones, for diffs and merges
+    """
+    rnd = random.Random(seed)
+    trie = OntTrie()
+    trie.legend = onto.ont.legend
+    for path, entries in onto.ont.iter_leaves():
+        new_entries = []
+        for entry in entries:
+            entry = list(entry)
+            if rnd.random() < changed:
+                entry[0] = gen_lemma(rnd)
+            new_entries.append(entry)
+        trie.add_entries(path, new_entries)
+    return LeavedOnto(trie)
+
+
+def gen_text(onto, lines=100, words_per_line=12, oov=0.1, seed=0):
+    """
+    Segmented text: one sentence per line, words separated by spaces.
+    Words are drawn from the lemmas of onto with a Zipf-like distribution, oov being the rate of unknown words.
+
+    :return: list of lines
+    """
+    rnd = random.Random(seed)
+    lemmas = sorted({entry[0] for _, entries in onto.ont.iter_leaves() for entry in entries})
+    rnd.shuffle(lemmas)
+    weights = [1 / (rank + 1) for rank in range(len(lemmas))]
+
+    text = []
+    for _ in range(lines):
+        words = rnd.choices(lemmas, weights=weights, k=words_per_line) if lemmas else []
+        words = [gen_lemma(rnd) if rnd.random() < oov else w for w in words]
+        text.append(" ".join(words))
+    return text
+
+
+def write_text(text, out_file):
+    Path(out_file).write_text("\n".join(text) + "\n", encoding="utf-8")
+
+
+def write_master_layout(onto, out_dir, origins=4):
+    """
+    Writes onto as a master onto with the empty base-level and level ontos recompose_ontos_from_master() expects:
+        out_dir/master_onto.yaml, out_dir/<level>.yaml and out_dir/<level>/text<n>.yaml
+
+    :return: path to the master onto
+    """
+    out_dir = Path(out_dir)
+    for level in LEVELS:
+        (out_dir / level).mkdir(parents=True, exist_ok=True)
+        (out_dir / f"{level}.yaml").write_text("legend: []\nont: {}\n")
+    for o in range(origins):
+        (out_dir / LEVELS[o % len(LEVELS)] / f"text{o}.yaml").write_text("legend: []\nont: {}\n")
+
+    master = out_dir / "master_onto.yaml"
+    onto.convert2yaml(master)
+    return master
@@ -1,11 +1,35 @@
 from pathlib import Path
 
-from .leavedonto import LeavedOnto
-from .ontomanager import OntoManager
-from .trie import OntTrie
+# the public classes are imported on first access: "import leavedonto" does not load
+# the modules of the package, nor their dependencies (openpyxl, tibetan_sort, ...).
+# the same goes inside the package: the modules needing openpyxl (xlsx files, tagging sheets) or tibetan_sort
+# (sorting) are imported in the functions using them, so that the other operations never load them.
+_lazy = {
+    "LeavedOnto": ".leavedonto",
+    "OntoManager": ".ontomanager",
+    "OntTrie": ".trie",
+    "instrumentation": ".instrument",
+}
+__all__ = list(_lazy) + ["merge_ontos", "export"]
+
+
+def __getattr__(name):
+    if name in _lazy:
+        from importlib import import_module
+
+        value = getattr(import_module(_lazy[name], __name__), name)
+        globals()[name] = value  # following accesses don't go through __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy))
 
 
 def merge_ontos(ontos_path, out_file, basis=None):
+    from .ontomanager import OntoManager
+
     if basis:
         om = OntoManager(basis)
     else:
@@ -23,6 +47,8 @@ def merge_ontos(ontos_path, out_file, basis=None):
 
 
 def export(onto, to, out_path=None):
+    from .leavedonto import LeavedOnto
+
     lo = LeavedOnto(onto)
     if to == 'yaml':
         lo.convert2yaml(out_path)
@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from .leavedonto import LeavedOnto
+from .ontomanager import OntoManager
+from .progress import Progress
+
+
+class AsyncOnto:
+    """
+    Awaitable loads, exports, merges and lookups for asyncio applications. The blocking work runs in an executor,
+    at most <max_concurrency> operations at a time, so that the event loop keeps serving requests meanwhile.
+
+    Cancelling an operation never leaves an onto half modified: merges work on a fork of the onto, which is only
+    returned once the merge completes. A cancelled operation already running is left to finish in the executor,
+    and keeps its slot until then.
+    """
+    def __init__(self, executor=None, max_concurrency=4):
+        self.executor = executor if executor else ThreadPoolExecutor(max_workers=max_concurrency)
+        self.__own_executor = executor is None
+        self.__slots = asyncio.Semaphore(max_concurrency)
+
+    async def __run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        await self.__slots.acquire()
+        try:
+            future = self.executor.submit(partial(func, *args, **kwargs))
+        except BaseException:
+            self.__slots.release()
+            raise
+        # the slot is released when the job is over, not when the awaiting task is cancelled
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.__slots.release))
+        return await asyncio.wrap_future(future)
+
+    async def load(self, onto_path):
+        return await self.__run(LeavedOnto, Path(onto_path))
+
+    async def export(self, onto, out_path, progress=None):
+        """
+        :param out_path: .yaml or .xlsx, the format being deduced from the suffix
+        """
+        out_path = Path(out_path)
+        progress = progress if progress else Progress()
+        if out_path.suffix == ".xlsx":
+            return await self.__run(onto.convert2xlsx, out_path, progress=progress)
+        return await self.__run(onto.convert2yaml, out_path, progress=progress)
+
+    async def merge(self, onto1, onto2, in_to_organize=False):
+        """
+        Merges onto2 into a copy of onto1, see OntoManager.merge_to_onto()
+
+        :param onto1: LeavedOnto, left untouched
+        :param onto2: LeavedOnto, left untouched, or path to an onto
+        :return: the merged LeavedOnto
+        """
+        def merge():
+            om = OntoManager()
+            om.onto1 = onto1.fork()
+            om.merge_to_onto(onto2, in_to_organize=in_to_organize)
+            return om.onto1
+
+        return await self.__run(merge)
+
+    async def lookup_many(self, onto, words):
+        """
+        :return: {<word>: <results of onto.find_word(word)>}
+        """
+        return await self.__run(lambda: {word: onto.find_word(word) for word in words})
+
+    def close(self):
+        if self.__own_executor:
+            self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .tag_to_onto import generate_to_tag, count_tagged
+from .progress import Progress
+
+# read-only state of the worker processes, set by _init_worker()
+_worker = {}
+
+
+def _init_worker(snapshot, pos_list, levels, l_colors, fields, similar):
+    _worker.update(snapshot=snapshot, pos_list=pos_list, levels=levels, l_colors=l_colors, fields=fields,
+                   similar=similar)
+
+
+def _tag_file(in_file, out_file):
+    cache = _worker["snapshot"]
+    start, words = time.perf_counter(), cache.hits + cache.misses
+    generate_to_tag(
+        in_file, None, _worker["pos_list"], _worker["levels"], _worker["l_colors"],
+        out_file=out_file, fields=_worker["fields"], cache=cache, progress=Progress(), similar=_worker["similar"],
+    )
+    return in_file, cache.hits + cache.misses - words, time.perf_counter() - start
+
+
+def pool_context():
+    # fork shares the snapshot of the parent with the workers (copy-on-write), otherwise it is pickled once per worker
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def tag_files(jobs, snapshot, pos_list, levels, l_colors, fields, workers=None, similar=0):
+    """
+    Generates the tagging sheets of the jobs in a process pool
+
+    :param jobs: list of tuple(<in_file>, <out_file>)
+    :param snapshot: LookupCache.snapshot() of the onto
+    :return: yields tuple(<in_file>, <words>, <seconds>) as the files are processed
+    """
+    workers = workers if workers else os.cpu_count()
+    init_args = (snapshot, pos_list, levels, l_colors, fields, similar)
+
+    if workers <= 1 or len(jobs) <= 1:
+        _init_worker(*init_args)
+        for in_file, out_file in jobs:
+            yield _tag_file(in_file, out_file)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(jobs)), mp_context=pool_context(), initializer=_init_worker, initargs=init_args
+    ) as executor:
+        futures = [executor.submit(_tag_file, in_file, out_file) for in_file, out_file in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def count_tagged_files(in_files, workers=None):
+    """
+    Map-reduce of count_tagged(): the tagging sheets are read in a process pool, their counters are then merged
+
+    :return: Counter of tuple(word, POS, level) over all in_files
+    """
+    workers = workers if workers else os.cpu_count()
+    tagged = Counter()
+
+    if workers <= 1 or len(in_files) <= 1:
+        for in_file in in_files:
+            tagged.update(count_tagged(in_file))
+        return tagged
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(in_files)), mp_context=pool_context()) as executor:
+        for counts in executor.map(count_tagged, in_files):
+            tagged.update(counts)
+    return tagged
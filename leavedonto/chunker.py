@@ -0,0 +1,108 @@
+from itertools import islice
+
+# number of lines per chunk
+CHUNK_SIZES = {"sentence": 4, "chunk": 48}
+# number of words per row in "chunk" mode
+ROW_SIZE = 12
+
+
+def chunk_size(line_mode):
+    if line_mode not in CHUNK_SIZES:
+        raise SyntaxError('line_mode is either "sentence" or "chunk".')
+    return CHUNK_SIZES[line_mode]
+
+
+def iter_lines(in_file, offset=0):
+    """
+    Streams the lines of a segmented file as lists of words.
+    Like reading the whole file and stripping it: the BOM, leading and trailing empty lines are left out.
+
+    :param offset: byte offset of a line given by index_chunks(), to start reading from
+    """
+    for _, line in stripped_lines(in_file, offset=offset):
+        yield line.split(" ")
+
+
+def stripped_lines(in_file, offset=0):
+    """
+    The lines streamed by iter_lines(), not split, as tuple(<byte offset of the line>, <stripped line>)
+    """
+    with open(in_file, "rb") as f:
+        f.seek(offset)
+        # an offset given by index_chunks() is inside the text: its empty lines are kept
+        started = offset > 0
+        blanks = []
+        pos = offset
+        for raw in f:
+            line = raw.decode("utf-8")
+            if pos == 0:
+                line = line.lstrip("\ufeff")
+            line_pos, pos = pos, pos + len(raw)
+            line = line.strip()
+            if not line:
+                if started:
+                    blanks.append((line_pos, ""))
+                continue
+            started = True
+            # only keep empty lines followed by text
+            yield from blanks
+            blanks = []
+            yield line_pos, line
+
+
+def index_chunks(in_file, line_mode):
+    """
+    :return: byte offsets of the first line of every chunk, for iter_chunks() to start reading at any of them
+    """
+    size = chunk_size(line_mode)
+    return [pos for n, (pos, _) in enumerate(stripped_lines(in_file)) if n % size == 0]
+
+
+def iter_chunks(in_file, line_mode, start=0, offset=None):
+    """
+    Yields tuple(<chunk number>, <list of lines>), starting at chunk number <start>.
+
+    :param offset: byte offset of chunk <start>, given by index_chunks(). The lines of the chunks before <start>
+                   are then not read at all, otherwise they are read but not processed.
+    """
+    size = chunk_size(line_mode)
+    if offset is not None:
+        lines = iter_lines(in_file, offset=offset)
+    else:
+        lines = iter_lines(in_file)
+        if start:
+            next(islice(lines, start * size - 1, None), None)
+
+    c_count = start
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield c_count, chunk
+        c_count += 1
+
+
+def count_chunks(in_file, line_mode):
+    return len(index_chunks(in_file, line_mode))
+
+
+def iter_rows(lines, line_mode):
+    """
+    Yields the rows of a sheet to tag: one per line in "sentence" mode, ROW_SIZE words in "chunk" mode.
+    """
+    if line_mode == "sentence":
+        yield from lines
+
+    elif line_mode == "chunk":
+        cur_row = []
+        for line in lines:
+            for word in line:
+                cur_row.append(word)
+                if len(cur_row) == ROW_SIZE:
+                    yield cur_row
+                    cur_row = []
+        if cur_row:
+            yield cur_row
+
+    else:
+        raise SyntaxError('line_mode is either "sentence" or "chunk".')
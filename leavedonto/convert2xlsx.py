@@ -5,12 +5,15 @@ from openpyxl.styles import Font, Alignment
 
 from .triedicts import trie_to_dicts
 from .utils import resize_sheet
+from .instrument import phase
+from .progress import Progress
 
 
 class Convert2Xlsx:
-    def __init__(self, ont_path, ont):
+    def __init__(self, ont_path, ont, progress=None):
         self.ont_path = ont_path
-        self.ont = trie_to_dicts(ont)
+        self.progress = progress if progress else Progress()
+        self.ont = trie_to_dicts(ont, progress=self.progress)
 
     def convert2xlsx(self, out_path=None):
         def add_sheet(sheet, data, ft_style, starting_row=0):
@@ -28,32 +31,36 @@ class Convert2Xlsx:
         ft_entries = Font(font, size=15)
         alignmnt = Alignment(horizontal="left", vertical="top")
 
-        wb = Workbook()
-        wb.remove(wb["Sheet"])
+        with phase("xlsx.sheets"):
+            wb = Workbook()
+            wb.remove(wb["Sheet"])
 
-        # adding the tree structure
-        ws = wb.create_sheet("0 Ontology")
+            # adding the tree structure
+            ws = wb.create_sheet("0 Ontology")
 
-        add_sheet(ws, tree, ft_structure)
-        resize_sheet(ws)
-        ws.freeze_panes = "B1"
+            add_sheet(ws, tree, ft_structure)
+            resize_sheet(ws)
+            ws.freeze_panes = "B1"
 
-        # adding the lists in individual sheets
-        num = 1
-        for title, sheet in sheets:
-            ws = wb.create_sheet(f"{num} {title}")
+            # adding the lists in individual sheets
+            num = 1
+            self.progress.start("xlsx sheets", total=len(sheets))
+            for title, sheet in sheets:
+                ws = wb.create_sheet(f"{num} {title}")
+                self.progress.update(entries=len(sheet) if sheet else 0)
 
-            num += 1
-            for n, lgd in enumerate(self.ont["legend"]):
-                ws.cell(1, n + 1).value = lgd
-                ws.cell(1, n + 1).font = ft_legend
+                num += 1
+                for n, lgd in enumerate(self.ont["legend"]):
+                    ws.cell(1, n + 1).value = lgd
+                    ws.cell(1, n + 1).font = ft_legend
 
-            if not sheet:
-                continue
+                if not sheet:
+                    continue
 
-            add_sheet(ws, sheet, ft_entries, starting_row=1)
-            resize_sheet(ws)
-            ws.freeze_panes = "A2"
+                add_sheet(ws, sheet, ft_entries, starting_row=1)
+                resize_sheet(ws)
+                ws.freeze_panes = "A2"
+            self.progress.finish()
 
         if not out_path:
             out_path = self.ont_path.parent
@@ -66,7 +73,8 @@ class Convert2Xlsx:
         else:
             out_file = out_path
 
-        wb.save(out_file)
+        with phase("xlsx.save"):
+            wb.save(out_file)
 
     def get_ont_tree(self):
         def extract_level(structure, level, key, value):
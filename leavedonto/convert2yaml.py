@@ -1,18 +1,22 @@
+import os
 from pathlib import Path
 
 import yaml  # PyYaml package
 
 from .triedicts import trie_to_dicts
+from .instrument import phase
 
 
 class Convert2Yaml:
-    def __init__(self, ont_path, ont):
+    def __init__(self, ont_path, ont, progress=None):
         self.ont_path = ont_path
-        self.ont = trie_to_dicts(ont)
+        self.ont = trie_to_dicts(ont, progress=progress)
 
     def gen_yaml(self):
-        out = yaml.safe_dump(self.ont, allow_unicode=True)
-        out = self.__group_leaf_entries(out)
+        with phase("yaml.dump"):
+            out = yaml.safe_dump(self.ont, allow_unicode=True)
+        with phase("yaml.group_entries"):
+            out = self.__group_leaf_entries(out)
         return out
 
     def convert2yaml(self, out_path=None):
@@ -29,7 +33,11 @@ class Convert2Yaml:
             out_file = Path(out_path) / (self.ont_path.stem + ".yaml")
         else:
             out_file = out_path
-        out_file.write_text(out)
+        with phase("yaml.write"):
+            # written aside, then renamed: processes watching out_file never read it half written
+            tmp_file = out_file.with_name(out_file.name + ".tmp")
+            tmp_file.write_text(out)
+            os.replace(tmp_file, out_file)
 
     @staticmethod
     def __group_leaf_entries(out):
@@ -40,7 +48,7 @@ class Convert2Yaml:
         lines_with_split_long_lines = out.split("\n")
         lines = []
         for line in lines_with_split_long_lines:
-            if line.lstrip().startswith('-') or line.rstrip().endswith(':'):
+            if line.lstrip().startswith('-') or line.rstrip().endswith((':', ': {}', ': []')):
                 lines.append(line)
             else:
                 lines[-1] = lines[-1].rstrip() + ' ' + line.lstrip()
@@ -53,7 +61,7 @@ class Convert2Yaml:
             elif cur_line.startswith(legend):
                 # find legend
                 group = [cur_line]
-                while lines[cur_idx].startswith(legend):
+                while cur_idx < len(lines) and lines[cur_idx].startswith(legend):
                     group.append(lines[cur_idx])
                     cur_idx += 1
                 cur_idx -= 1  # undo extra increment
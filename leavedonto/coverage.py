@@ -0,0 +1,104 @@
+import re
+from collections import Counter
+from pathlib import Path
+
+from .chunker import iter_lines
+
+# tokens only made of punctuation are not counted
+PUNCT = re.compile(r"^[༄-༔\s]*$")
+
+
+class Coverage:
+    """
+    Streams segmented texts through a single counting pass to measure how much of them the onto covers.
+
+    Memory depends on the vocabulary of the texts, not on the number of tokens: every distinct word is kept,
+    with the exact count of the uncovered ones.
+    """
+    def __init__(self, onto, top=20):
+        self.onto = onto
+        self.top = top
+
+        # {<lemma>: (<path>, <first entry>)}, like find_word()
+        self.lemmas = {}
+        for path, entries in onto.ont.iter_leaves():
+            for entry in entries:
+                self.lemmas.setdefault(entry[0], (path, entry))
+        self.has_level = "level" in onto.ont.legend
+
+        self.freqs = Counter()  # covered lemmas, bounded by the size of the onto
+        self.uncovered = Counter()
+        self.categories = Counter()
+        self.levels = Counter()
+        self.files = {}
+
+    def count(self, paths):
+        if isinstance(paths, (str, Path)):
+            paths = [paths]
+
+        all_types, covered_types = set(), set()
+        for in_file in paths:
+            tokens, covered, types, f_covered_types = 0, 0, set(), set()
+            for line in iter_lines(in_file):
+                for word in line:
+                    if PUNCT.match(word):
+                        continue
+                    tokens += 1
+                    types.add(word)
+                    if word in self.lemmas:
+                        covered += 1
+                        f_covered_types.add(word)
+                        self.freqs[word] += 1
+                    else:
+                        self.uncovered[word] += 1
+
+            self.files[str(in_file)] = self.__stats(tokens, covered, len(types), len(f_covered_types))
+            all_types |= types
+            covered_types |= f_covered_types
+
+        # breakdown of the covered tokens
+        for word, freq in self.freqs.items():
+            path, entry = self.lemmas[word]
+            self.categories[path[0]] += freq
+            if self.has_level:
+                self.levels[self.onto.get_field_value(entry, "level")] += freq
+
+        tokens = sum(f["tokens"] for f in self.files.values())
+        covered = sum(f["covered_tokens"] for f in self.files.values())
+        return {
+            "files": self.files,
+            "total": self.__stats(tokens, covered, len(all_types), len(covered_types)),
+            "uncovered": self.uncovered.most_common(self.top),
+            "categories": dict(self.categories.most_common()),
+            "levels": dict(self.levels.most_common()),
+        }
+
+    def update_freqs(self, mode="replace"):
+        """
+        Writes the counted freqs in the first entry of each covered lemma.
+        mode: "replace" the freq field, or "add" the counts to it
+        """
+        if mode != "replace" and mode != "add":
+            raise ValueError('mode can be "replace" or "add"')
+
+        with self.onto.ont.transaction():
+            for word, freq in self.freqs.items():
+                path, entry = self.lemmas[word]
+                if mode == "add":
+                    try:
+                        freq += int(self.onto.get_field_value(entry, "freq"))
+                    except (TypeError, ValueError):
+                        pass
+                new_entry = self.onto.replace_field_value(path, entry, "freq", freq, mode="replace")
+                self.lemmas[word] = (path, new_entry)
+
+    @staticmethod
+    def __stats(tokens, covered, types, covered_types):
+        return {
+            "tokens": tokens,
+            "covered_tokens": covered,
+            "token_coverage": covered / tokens if tokens else 0.0,
+            "types": types,
+            "covered_types": covered_types,
+            "type_coverage": covered_types / types if types else 0.0,
+        }
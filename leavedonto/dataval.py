@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from openpyxl.worksheet.datavalidation import DataValidation
 from openpyxl.utils.cell import (
     coordinate_from_string,
@@ -13,13 +15,16 @@ validator2, values2 = 'other', ['a', 'b', 'c']
 
 # add validators
 dv = DataVal(workbook)
-wb.add_validator(validator1, values1)
-wb.add_validator(validator2, values2)
+dv.add_validator(validator1, values1)
+dv.add_validator(validator2, values2)
 
 # apply validators to a worksheet
-wb.add_val_to_cell(validator1, sheet_name, idx='B1')  # add validation to B1
-wb.add_val_to_row(validator1, sheet_name, 3)  # add validation to row 3
-wb.add_val_to_col(validator2, sheet_name, 1)  # add validation to col 1
+dv.add_val_to_cell(validator1, sheet_name, idx='B1')  # add validation to B1
+dv.add_val_to_row(validator1, sheet_name, 3)  # add validation to row 3
+dv.add_val_to_col(validator2, sheet_name, 1)  # add validation to col 1
+
+# many cells at once: coalesced into as few ranges as possible
+dv.add_val_to_cells(validator1, sheet_name, [(2, 1), (2, 2)])  # add validation to A2:B2
 """
 
 
@@ -33,35 +38,102 @@ class DataVal:
             "prompt_title": "",
         }
         self.validators = {}
+        # {(<val_name>, <sheet_name>): <DataValidation>} one validator attached once per sheet
+        self.sheet_validators = {}
 
     def add_validator(self, title, values):
-        values = ",".join(values)
-        dv = DataValidation(type="list", formula1=f'"{values}"')
-        dv.error = self.msgs["error"]
-        dv.errorTitle = self.msgs["error_title"]
-        dv.prompt = self.msgs["prompt"]
-        dv.promptTitle = self.msgs["prompt_title"]
-
-        self.validators[title] = dv
+        self.validators[title] = ",".join(values)
 
     def add_val_to_row(self, val_name, sheet_name, row):
-        for col in range(1, self.wb[sheet_name].max_column + 1):
-            self.add_val_to_cell(val_name, sheet_name, row=row, col=col)
+        max_col = self.wb[sheet_name].max_column
+        self.add_val_to_range(val_name, sheet_name, row, 1, row, max_col)
 
     def add_val_to_col(self, val_name, sheet_name, col):
-        for row in range(1, self.wb[sheet_name].max_row + 1):
-            self.add_val_to_cell(val_name, sheet_name, row=row, col=col)
+        max_row = self.wb[sheet_name].max_row
+        self.add_val_to_range(val_name, sheet_name, 1, col, max_row, col)
+
+    def add_val_to_range(self, val_name, sheet_name, min_row, min_col, max_row, max_col):
+        range_ = f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}"
+        self.__sheet_validator(val_name, sheet_name).sqref.add(range_)
 
     def add_val_to_cell(self, val_name, sheet_name, idx=None, row=None, col=None):
         if idx:
             col, row = coordinate_from_string(idx)
             col = column_index_from_string(col)
-        if not idx:
-            idx = f"{get_column_letter(col)}{row}"
-        if (
-            self.validators[val_name]
-            not in self.wb[sheet_name].data_validations.dataValidation
-        ):
-            self.wb[sheet_name].add_data_validation(self.validators[val_name])
-
-        self.validators[val_name].add(idx)
+        self.add_val_to_range(val_name, sheet_name, row, col, row, col)
+
+    def add_val_to_cells(self, val_name, sheet_name, cells):
+        """
+        Coalesces cells into ranges before adding them: "A2:L2" instead of twelve cells.
+        Pass all the cells of a sheet at once for the fewest ranges.
+
+        :param cells: iterable of tuple(row, col)
+        """
+        dv = self.__sheet_validator(val_name, sheet_name)
+        for range_ in coalesce(set(cells)):
+            dv.sqref.add(range_)
+
+    def __sheet_validator(self, val_name, sheet_name):
+        if val_name not in self.validators:
+            raise KeyError(f"{val_name} is not a validator. Add it with add_validator() first.")
+        if (val_name, sheet_name) not in self.sheet_validators:
+            formula = f'"{self.validators[val_name]}"'
+            # reuse the validator of a reloaded workbook
+            for dv in self.wb[sheet_name].data_validations.dataValidation:
+                if dv.type == "list" and dv.formula1 == formula:
+                    self.sheet_validators[(val_name, sheet_name)] = dv
+                    return dv
+
+            dv = DataValidation(type="list", formula1=formula)
+            dv.error = self.msgs["error"]
+            dv.errorTitle = self.msgs["error_title"]
+            dv.prompt = self.msgs["prompt"]
+            dv.promptTitle = self.msgs["prompt_title"]
+            self.wb[sheet_name].add_data_validation(dv)
+            self.sheet_validators[(val_name, sheet_name)] = dv
+        return self.sheet_validators[(val_name, sheet_name)]
+
+
+def coalesce(cells):
+    """
+    Coalesces a set of tuple(row, col) into a list of rectangular ranges: "A2:L2", "A6:L9", "C10", ...
+    Contiguous cells of a row are joined first, then identical runs in consecutive rows.
+    """
+    rows = defaultdict(list)
+    for row, col in cells:
+        rows[row].append(col)
+
+    # {(<min_col>, <max_col>): [<min_row>, <max_row>]} rectangles that can still grow downwards
+    open_ranges = {}
+    ranges = []
+
+    def close(run):
+        (min_col, max_col), (min_row, max_row) = run, open_ranges.pop(run)
+        range_ = f"{get_column_letter(min_col)}{min_row}"
+        if (min_col, min_row) != (max_col, max_row):
+            range_ += f":{get_column_letter(max_col)}{max_row}"
+        ranges.append(range_)
+
+    for row in sorted(rows):
+        runs = []
+        cols = sorted(rows[row])
+        start = prev = cols[0]
+        for col in cols[1:]:
+            if col != prev + 1:
+                runs.append((start, prev))
+                start = col
+            prev = col
+        runs.append((start, prev))
+
+        for run in list(open_ranges):
+            if run not in runs or open_ranges[run][1] != row - 1:
+                close(run)
+        for run in runs:
+            if run in open_ranges:
+                open_ranges[run][1] = row
+            else:
+                open_ranges[run] = [row, row]
+
+    for run in list(open_ranges):
+        close(run)
+    return ranges
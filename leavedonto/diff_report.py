@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+
+import yaml
+
+from .origins import format_entry
+
+
+class DiffReport:
+    """
+    Writes diff records to out_file as they are found.
+
+    formats:
+        - yaml: a list of {diff, path, entry} (base_only, other_only)
+                or {diff, path, base, other} (shared) records
+        - jsonl: the same records, one json object per line
+        - xlsx: a write-only workbook with one sheet per category
+    """
+    categories = ["base_only", "other_only", "shared"]
+    formats = {".yaml": "yaml", ".jsonl": "jsonl", ".xlsx": "xlsx"}
+
+    def __init__(self, out_file, legend, format=None):
+        self.out_file = Path(out_file)
+        if not format:
+            if self.out_file.suffix not in self.formats:
+                raise ValueError("out_path should either be a .yaml, a .jsonl or a .xlsx")
+            format = self.formats[self.out_file.suffix]
+        if format not in self.formats.values():
+            raise ValueError('format should either be "yaml", "jsonl" or "xlsx".')
+
+        self.format = format
+        self.legend = legend
+        self.counts = {c: 0 for c in self.categories}
+        self.f = None
+        self.wb = None
+        self.sheets = {}
+
+    def __enter__(self):
+        if self.format == "xlsx":
+            from openpyxl import Workbook
+
+            self.wb = Workbook(write_only=True)
+            for c in self.categories:
+                self.sheets[c] = self.wb.create_sheet(c)
+                if c == "shared":
+                    self.sheets[c].append(["path", "onto"] + self.legend)
+                else:
+                    self.sheets[c].append(["path"] + self.legend)
+        else:
+            self.f = self.out_file.open("w", encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.wb:
+            self.wb.save(self.out_file)
+        if self.f:
+            self.f.close()
+
+    def write(self, category, path, entry, other=None):
+        self.counts[category] += 1
+        entry = format_entry(entry)
+        other = format_entry(other) if other else other
+
+        if self.format == "xlsx":
+            path_ = " > ".join(path)
+            if category == "shared":
+                self.sheets[category].append([path_, "base"] + entry)
+                self.sheets[category].append([path_, "other"] + other)
+            else:
+                self.sheets[category].append([path_] + entry)
+            return
+
+        if category == "shared":
+            record = {"diff": category, "path": path, "base": entry, "other": other}
+        else:
+            record = {"diff": category, "path": path, "entry": entry}
+
+        if self.format == "yaml":
+            self.f.write(yaml.safe_dump([record], allow_unicode=True, sort_keys=False))
+        else:
+            self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def print_summary(self):
+        for c in self.categories:
+            print(f"{c}: {self.counts[c]}")
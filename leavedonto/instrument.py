@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# set to any non-empty value to time the phases from the start
+ENV_VAR = "LEAVEDONTO_PROFILE"
+
+
+class Instrumentation:
+    """
+    Opt-in timing of named phases and counting of calls on the hot paths.
+
+    Disabled, a phase costs one attribute check. Enabled, each phase records its number of calls and
+    its cumulated time; nested phases are timed independently, so their times overlap.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = defaultdict(lambda: [0, 0.0])  # {<name>: [<calls>, <seconds>]}
+        self.counters = Counter()
+        self.profile_stats = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.phases.clear()
+        self.counters.clear()
+        self.profile_stats = None
+
+    def phase(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self.__timed(name)
+
+    @contextmanager
+    def __timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = self.phases[name]
+            record[0] += 1
+            record[1] += time.perf_counter() - start
+
+    def count(self, name):
+        if self.enabled:
+            self.counters[name] += 1
+
+    @contextmanager
+    def profile(self, out_file=None, top=30):
+        """
+        Runs cProfile alongside the phases. The <top> functions by cumulative time are attached to the report,
+        the raw stats are dumped to out_file if given (to be read with pstats or snakeviz).
+        """
+        import cProfile  # not needed unless profiling
+        import pstats
+
+        was_enabled = self.enabled
+        self.enable()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield self
+        finally:
+            profiler.disable()
+            self.enabled = was_enabled
+            if out_file:
+                profiler.dump_stats(str(out_file))
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+            self.profile_stats = stream.getvalue()
+
+    def report(self):
+        report = {
+            "phases": {
+                name: {"calls": calls, "seconds": round(seconds, 6)}
+                for name, (calls, seconds) in sorted(self.phases.items(), key=lambda x: -x[1][1])
+            },
+            "counters": dict(self.counters.most_common()),
+        }
+        if self.profile_stats:
+            report["profile"] = self.profile_stats
+        return report
+
+    def dump(self, out_file):
+        with open(out_file, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+
+# shared by all the modules of leavedonto
+instrumentation = Instrumentation(enabled=bool(os.environ.get(ENV_VAR)))
+
+
+def phase(name):
+    return instrumentation.phase(name)
+
+
+def count(name):
+    if instrumentation.enabled:
+        instrumentation.counters[name] += 1
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as the phase <name>
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return func(*args, **kwargs)
+            with instrumentation.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
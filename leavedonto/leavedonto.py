@@ -1,13 +1,16 @@
+from copy import copy
 from pathlib import Path
 from itertools import zip_longest
 
 import yaml  # PyYaml package
 
-from .load_xlsx import LoadXlsx
-from .triedicts import DictsToTrie, trie_to_dicts
-from .convert2xlsx import Convert2Xlsx
+from .triedicts import DictsToTrie
 from .convert2yaml import Convert2Yaml
-from .sort_bo_lists import SortBoLists
+from .coverage import Coverage
+from .instrument import phase, timed
+from .progress import get_progress
+from .origins import Origins, format_entry
+from .similar import LemmaIndex
 from .trie import OntTrie
 
 
@@ -15,6 +18,7 @@ class LeavedOnto:
     def __init__(self, ont, ont_path=None):
         self.ont_path = ont
         self.ont = None
+        self._similar = None  # tuple(<trie>, <generation>, <LemmaIndex>) of find_similar()
         if isinstance(ont, str) or isinstance(ont, Path):
             self.ont_path = Path(ont)
             self._load()
@@ -30,12 +34,14 @@ class LeavedOnto:
 
         self._cleanup()
 
-    def convert2xlsx(self, out_path=None):
-        cx = Convert2Xlsx(self.ont_path, self.ont)
+    def convert2xlsx(self, out_path=None, progress=None):
+        from .convert2xlsx import Convert2Xlsx
+
+        cx = Convert2Xlsx(self.ont_path, self.ont, progress=get_progress(progress))
         cx.convert2xlsx(out_path)
 
-    def convert2yaml(self, out_path=None):
-        cy = Convert2Yaml(self.ont_path, self.ont)
+    def convert2yaml(self, out_path=None, progress=None):
+        cy = Convert2Yaml(self.ont_path, self.ont, progress=get_progress(progress))
         cy.convert2yaml(out_path)
 
     def export_yaml_str(self):
@@ -43,9 +49,69 @@ class LeavedOnto:
         yaml_str = cy.gen_yaml()
         return yaml_str
 
+    def fork(self):
+        """
+        Copy of the onto that shares its trie with this one until either is modified, see OntTrie.snapshot().
+        The entries are shared too: edit them with replace_field_value(), which replaces them instead of modifying them.
+        """
+        forked = copy(self)
+        forked.ont = self.ont.snapshot()
+        return forked
+
     def find_word(self, word):
         return self.ont.find_entries(lemma=word)
 
+    def find_similar(self, word, max_distance=1, granularity="char"):
+        """
+        Lemmas of the onto within max_distance edits of word, e.g. spelling variants of an unknown word.
+
+        :param granularity: "char" (a missing tsek is one edit) or "syllable" (tseks are ignored)
+        :return: list of tuple(<lemma>, <distance>), the closest first
+        """
+        # the index is built on the first search, and again whenever the onto was modified
+        if not self._similar or self._similar[0] is not self.ont or self._similar[1] != self.ont.generation:
+            self._similar = (self.ont, self.ont.generation, LemmaIndex.from_onto(self))
+        return self._similar[2].search(word, max_distance=max_distance, granularity=granularity)
+
+    def query(self, where, prefix=None):
+        """
+        Entries whose fields satisfy the conditions of where, e.g. {"level": "A1", "freq": (">", 10)}.
+        See leavedonto.query for the conditions, and OntTrie.create_index() to speed up frequent queries.
+
+        :param prefix: category in which to search
+        :return: list of tuple(path, entries)
+        """
+        return self.ont.query(where, prefix=prefix)
+
+    def top_words(self, k=10, prefix=None, where=None):
+        """
+        The k most frequent entries of a category, e.g. top_words(20, prefix=["NOUN"], where={"level": "A1"})
+
+        :return: list of tuple(path, entry), the most frequent first
+        """
+        return self.ont.top_entries(k, prefix=prefix, where=where)
+
+    def words_above(self, freq, prefix=None, where=None):
+        """
+        Entries of a category with a freq of at least freq, the most frequent first
+        """
+        return self.ont.entries_above(freq, prefix=prefix, where=where)
+
+    def coverage(self, paths, top=20, update_freq=None):
+        """
+        Token and type coverage of segmented texts by the onto, with the most frequent uncovered words
+        and the covered tokens per top-level category and level.
+
+        :param paths: segmented file or list of segmented files
+        :param update_freq: None, "replace" or "add" the counted freqs to the first entry of each lemma
+        :return: report dict, see Coverage.count()
+        """
+        cov = Coverage(self, top=top)
+        report = cov.count(paths)
+        if update_freq:
+            cov.update_freqs(mode=update_freq)
+        return report
+
     def get_field_value(self, entry, field):
         if field not in self.ont.legend:
             raise IndexError(f"{field} not contained in legend:\n{self.ont.legend}")
@@ -55,6 +121,10 @@ class LeavedOnto:
         return None
 
     def set_field_value(self, entry, field, value, mode="append"):
+        """
+        Modifies entry in place. The entries of the onto are shared with its forks and indexed:
+        edit them with replace_field_value() instead.
+        """
         if mode != "replace" and mode != "append":
             raise ValueError('mode can be "replace" or "append"')
         if field not in self.ont.legend:
@@ -64,17 +134,41 @@ class LeavedOnto:
             if legend == field:
                 if mode == "replace":
                     entry[i] = value
-                if mode == "append":
+                if mode == "append" and field == "origin":
+                    entry[i] = Origins.parse(entry[i]) + Origins.parse(value)
+                elif mode == "append":
                     parts = entry[i].split(" — ")
                     parts.append(value)
                     parts = sorted([p for p in set(parts) if p])
                     entry[i] = " — ".join(parts)
 
+    def with_field_value(self, entry, field, value, mode="append"):
+        """
+        Copy of entry with the field set, see set_field_value()
+        """
+        entry = list(entry)
+        self.set_field_value(entry, field, value, mode=mode)
+        return entry
+
+    def replace_field_value(self, path, entry, field, value, mode="append"):
+        """
+        Replaces entry in the leaf at path by a copy with the field set, for the indexes to be updated
+        and the forks of the onto to be left untouched.
+
+        :return: the new entry, or None if entry is not in the leaf
+        """
+        new_entry = self.with_field_value(entry, field, value, mode=mode)
+        if not self.ont.replace_entry(path, entry, new_entry):
+            return None
+        return new_entry
+
     def set_legend(self, legend):
         self.ont.legend = legend
 
     def _load(self):
         if self.ont_path.suffix == ".xlsx":
+            from .load_xlsx import LoadXlsx
+
             lx = LoadXlsx(self.ont_path)
             self.ont = lx.load_xlsx()
         elif self.ont_path.suffix == ".yaml":
@@ -83,40 +177,60 @@ class LeavedOnto:
             raise ValueError("only supports xlsx and yaml files.")
 
     def _load_yaml(self):
-        ont_yaml = yaml.safe_load(self.ont_path.read_text())
-        dt = DictsToTrie(ont_yaml)
+        with phase("load.parse"):
+            ont_yaml = yaml.safe_load(self.ont_path.read_text())
+        with phase("load.trie"):
+            dt = DictsToTrie(ont_yaml)
         self.ont = dt.trie
 
+    @timed("cleanup")
     def _cleanup(self):
-        queue = [self.ont.head]
-        while queue:
-            current_node = queue.pop()
-            if current_node.leaf:
-                # remove duplicates and sort in tibetan order
-                no_dups = [list(L) for L in set(map(tuple, current_node.data))]
-                sorted_ = SortBoLists().sort_list_of_lists(no_dups)
-                current_node.data = sorted_
-
-            queue = [node for key, node in current_node.children.items()] + queue
+        from .sort_bo_lists import entry_sort_key
+
+        origin_idx = self.ont.legend.index("origin") if "origin" in self.ont.legend else None
+
+        def clean(entries):
+            # parse origins once, they are formatted back at export
+            if origin_idx is not None:
+                parsed = []
+                for entry in entries:
+                    # other values, None included, are left as they are on disk
+                    if len(entry) > origin_idx and type(entry[origin_idx]) in [str, dict]:
+                        entry = list(entry)  # entries are replaced, not modified
+                        entry[origin_idx] = Origins.parse(entry[origin_idx])
+                    parsed.append(entry)
+                entries = parsed
+
+            # remove duplicates and sort in tibetan order. the entries are kept, for the indexes to see no change
+            seen, no_dups = set(), []
+            for entry in entries:
+                key = tuple(format_entry(entry))
+                if key not in seen:
+                    seen.add(key)
+                    no_dups.append(entry)
+            return sorted(no_dups, key=entry_sort_key)
+
+        # counters are updated, duplicates being removed
+        self.ont.map_leaves(clean)
 
     def export_tree_report(self):
-        def extract_level(structure, level, key, value, total):
-            if not value or isinstance(value, list):
-                key += f": {len(value)}"
-                total.append(len(value))
-            structure.append([""] * level + [key])
+        # categories in the same order as trie_to_dicts(), counted by the trie itself
+        tree = {}
+        for path, _ in self.ont.iter_leaves():
+            node = tree
+            for p in path:
+                node = node.setdefault(p, {})
 
-        onto = trie_to_dicts(self.ont)
-        list_structure, level, total = [], 0, []
-        self.__recursive_extract(onto['ont'], extract_level, list_structure, level, total)
-        total_words = sum(total)
+        list_structure = []
+        self.__extract_levels(tree, [], list_structure)
+        total_words = self.ont.size()
 
         return list_structure, total_words
 
-    def __recursive_extract(self, ont, func, structure, level, total):
-        for key, value in ont.items():
-            func(structure, level, key, value, total)
-            if isinstance(value, dict):
-                self.__recursive_extract(value, func, structure, level + 1, total)
+    def __extract_levels(self, tree, path, structure):
+        for key, subtree in tree.items():
+            if subtree:
+                structure.append([""] * len(path) + [key])
+                self.__extract_levels(subtree, path + [key], structure)
             else:
-                continue
+                structure.append([""] * len(path) + [f"{key}: {self.ont.count_entries(path + [key])}"])
@@ -6,6 +6,7 @@ from openpyxl import load_workbook
 from openpyxl.utils import coordinate_to_tuple
 
 from .triedicts import DictsToTrie
+from .instrument import phase
 
 
 class LoadXlsx:
@@ -14,20 +15,22 @@ class LoadXlsx:
         self.ont_path = Path(ont_path)
 
     def load_xlsx(self):
-        # load xlsx
-        wb = load_workbook(self.ont_path)
-        ont = self.__load_ont_sheet(wb.worksheets[0])
-        leaves = self.__load_ont_leaves(wb.worksheets[1:])
-        ont = "\n".join(["".join(o) for o in ont])
+        with phase("load.parse"):
+            # load xlsx
+            wb = load_workbook(self.ont_path)
+            ont = self.__load_ont_sheet(wb.worksheets[0])
+            leaves = self.__load_ont_leaves(wb.worksheets[1:])
+            ont = "\n".join(["".join(o) for o in ont])
 
-        # convert to dicts
-        self.dicts["ont"] = yaml.safe_load(ont)
-        self.__add_leaves(self.dicts["ont"], leaves)
-        self.dicts["legend"] = self.__find_legend(wb)
+            # convert to dicts
+            self.dicts["ont"] = yaml.safe_load(ont)
+            self.__add_leaves(self.dicts["ont"], leaves)
+            self.dicts["legend"] = self.__find_legend(wb)
 
         # convert to OntTrie
-        dt = DictsToTrie(self.dicts)
-        dt.convert()
+        with phase("load.trie"):
+            dt = DictsToTrie(self.dicts)
+            dt.convert()
         ont = dt.trie
         return ont
 
@@ -61,7 +64,7 @@ class LoadXlsx:
     def __load_ont_leaves(sheets):
         leaves = {}
         for sheet in sheets:
-            idx = int(sheet.title)
+            idx = int(sheet.title.split(" ")[0])  # sheets are titled "<idx> <leaf name>" by Convert2Xlsx
 
             leaf = []
             max_row, max_col = coordinate_to_tuple(sheet.dimensions.split(":")[1])
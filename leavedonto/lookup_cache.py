@@ -0,0 +1,93 @@
+class LookupCache:
+    """
+    Resolves each distinct word once against an onto, for the tagging sheet generators.
+
+    A single LookupCache can be passed to the generators of all the chunks of a text
+    or of all the texts of a batch. clear() it whenever the onto is modified.
+    """
+    def __init__(self, onto):
+        self.onto = onto
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        # True when all the lemmas of the onto are in the cache: the onto is not needed anymore
+        self.complete = False
+        # {(<word>, <max distance>): <similar lemmas>}, see similar()
+        self.similars = {}
+        self.index = None
+
+    @classmethod
+    def snapshot(cls, onto):
+        """
+        A read-only cache resolving all the lemmas of onto upfront. It holds no reference to onto,
+        which makes it a compact, picklable form of the onto for the tagging worker processes.
+        """
+        has_level = "level" in onto.ont.legend
+        cache = cls(None)
+        for path, entries in onto.ont.iter_leaves():
+            for entry in entries:
+                if entry[0] not in cache.cache:
+                    # same as find_word(): first entry of the first leaf containing the lemma
+                    level = onto.get_field_value(entry, "level") if has_level else None
+                    cache.cache[entry[0]] = (path[0], level)
+        cache.complete = True
+        return cache
+
+    def lookup(self, word):
+        """
+        :param word: word to look up in the onto
+        :return: tuple(<POS>, <level>) of the first entry found, None if the word is not in the onto
+        """
+        if word in self.cache:
+            self.hits += 1
+            return self.cache[word]
+
+        self.misses += 1
+        if self.complete:
+            return None
+
+        found = self.onto.find_word(word)
+        if found:
+            path, entries = found[0]
+            level = self.onto.get_field_value(entries[0], "level") if "level" in self.onto.ont.legend else None
+            resolved = (path[0], level)
+        else:
+            resolved = None
+        self.cache[word] = resolved
+        return resolved
+
+    def similar(self, word, max_distance=1):
+        """
+        Known lemmas within max_distance edits of word, the closest first, to be offered for unknown words.
+        Each distinct word is only searched once.
+        """
+        key = (word, max_distance)
+        if key not in self.similars:
+            if self.complete:
+                if self.index is None:
+                    from .similar import LemmaIndex
+
+                    self.index = LemmaIndex(self.cache)
+                found = self.index.search(word, max_distance=max_distance)
+            else:
+                found = self.onto.find_similar(word, max_distance=max_distance)
+            self.similars[key] = [lemma for lemma, _ in found if lemma != word]
+        return self.similars[key]
+
+    def clear(self):
+        if self.complete:
+            raise ValueError("a snapshot can't be cleared. create a new one from the modified onto.")
+        self.cache = {}
+        self.similars = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "words": total,
+            "types": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
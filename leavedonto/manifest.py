@@ -0,0 +1,86 @@
+import json
+import os
+from pathlib import Path
+
+from .chunker import index_chunks
+
+
+class ChunkManifest:
+    """
+    Status of the chunks of a text being tagged, kept in <name>.manifest.json next to the tagging sheet.
+
+    Each processed chunk is written as an independent part file in <name>_parts/, the tagging sheet
+    is assembled from the parts once all of them are done.
+    """
+    def __init__(self, out_file, in_file, line_mode):
+        out_file, in_file = Path(out_file), Path(in_file)
+        name = out_file.stem.split("_")[0]
+        self.path = out_file.parent / f"{name}.manifest.json"
+        self.parts_dir = out_file.parent / f"{name}_parts"
+
+        # the text is only indexed again if it was modified since the manifest was written
+        signature = text_signature(in_file)
+        if self.path.is_file():
+            self.content = json.loads(self.path.read_text(encoding="utf-8"))
+            if self.content["line_mode"] != line_mode:
+                raise ValueError(
+                    f"{self.path} was created for another line_mode.\n"
+                    f"Please delete it together with {self.parts_dir} and rerun."
+                )
+            if self.content.get("signature") != signature:
+                offsets = index_chunks(in_file, line_mode)
+                if len(offsets) != self.content["n_chunks"]:
+                    raise ValueError(
+                        f"{self.path} was created for another version of {in_file}.\n"
+                        f"Please delete it together with {self.parts_dir} and rerun."
+                    )
+                self.content["offsets"], self.content["signature"] = offsets, signature
+        else:
+            offsets = index_chunks(in_file, line_mode)
+            self.content = {
+                "in_file": str(in_file),
+                "line_mode": line_mode,
+                "n_chunks": len(offsets),
+                "chunks": {str(c): "todo" for c in range(len(offsets))},
+                # byte offset of each chunk in in_file, and [<size>, <mtime in ns>] of in_file when it was indexed
+                "offsets": offsets,
+                "signature": signature,
+            }
+
+    @property
+    def n_chunks(self):
+        return self.content["n_chunks"]
+
+    def offset(self, c_count):
+        return self.content["offsets"][c_count]
+
+    @property
+    def pending(self):
+        return [int(c) for c, status in self.content["chunks"].items() if status == "todo"]
+
+    @property
+    def is_complete(self):
+        return not self.pending
+
+    def part_file(self, c_count):
+        return self.parts_dir / f"{c_count:06}.json"
+
+    def parts(self):
+        return [self.part_file(c) for c in range(self.content["n_chunks"]) if self.part_file(c).is_file()]
+
+    def write_part(self, c_count, rows):
+        self.parts_dir.mkdir(exist_ok=True)
+        part = {"chunk": c_count, "rows": rows}
+        self.part_file(c_count).write_text(json.dumps(part, ensure_ascii=False), encoding="utf-8")
+        self.content["chunks"][str(c_count)] = "done"
+
+    def save(self):
+        # write then rename, so that an interrupted run never leaves a truncated manifest
+        tmp = self.path.parent / (self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.content, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def text_signature(in_file):
+    stat = in_file.stat()
+    return [stat.st_size, stat.st_mtime_ns]
@@ -1,12 +1,19 @@
 from collections import defaultdict
-from copy import deepcopy
 from pathlib import Path
 
 import yaml
 
 from .leavedonto import LeavedOnto
+from .diff_report import DiffReport
+from .recompose import RecomposeFromMaster
+from .origins import Origins
+from .chunker import iter_chunks
+from .manifest import ChunkManifest
+from .lookup_cache import LookupCache
+from .segmenter import SyllableMatcher
 from .trie import OntTrie
-from .tag_to_onto import generate_to_tag, generate_to_tag_chunks, tagged_to_trie, get_entries
+from .instrument import phase
+from .progress import get_progress
 
 
 class OntoManager:
@@ -23,14 +30,7 @@ class OntoManager:
         :param mode: all, base_only, other_only, shared
         :return:
         """
-        if isinstance(onto2, LeavedOnto):
-            other_onto = onto2
-        elif isinstance(onto2, Path):
-            other_onto = LeavedOnto(onto2)
-        else:
-            raise TypeError(
-                "to_diff should be either a Path object, or a LeavedOnto object"
-            )
+        other_onto = self.__load_other(onto2)
 
         base_only, shared, other_only = self.__find_differences(other_onto, mode=mode)
 
@@ -45,6 +45,69 @@ class OntoManager:
         else:
             raise SyntaxError("either all, base_only, other_only or shared")
 
+    def diff_to_file(self, onto2, out_path, format=None):
+        """
+        Streams the differences between onto1 and onto2 to out_path, leaf by leaf.
+
+        :param onto2: path to onto to diff or LeavedOnto object
+        :param out_path: .yaml, .jsonl or .xlsx file
+        :param format: yaml, jsonl or xlsx. deduced from out_path if omitted
+        :return: the number of records written in each category
+        """
+        other_onto = self.__load_other(onto2)
+        ignore = self.__ignored_idx(["freq", "origin"])
+
+        with DiffReport(out_path, self.onto1.ont.legend, format=format) as report:
+            # leaves of onto1, compared to the same leaf in onto2
+            for path, base_entries in self.onto1.ont.iter_leaves():
+                other_leaf = other_onto.ont.has_category(path)
+                other_entries = other_leaf["data"] if other_leaf else []
+
+                other_cleaned = {}
+                for entry in other_entries:
+                    other_cleaned.setdefault(self.__cleaned_key(entry, ignore), entry)
+                base_cleaned = set()
+
+                for entry in base_entries:
+                    key = self.__cleaned_key(entry, ignore)
+                    base_cleaned.add(key)
+                    if key not in other_cleaned:
+                        report.write("base_only", path, entry)
+                    elif other_cleaned[key] != entry:
+                        report.write("shared", path, entry, other=other_cleaned[key])
+
+                for entry in other_entries:
+                    if self.__cleaned_key(entry, ignore) not in base_cleaned:
+                        report.write("other_only", path, entry)
+
+            # leaves only in onto2
+            for path, other_entries in other_onto.ont.iter_leaves():
+                if self.onto1.ont.has_category(path):
+                    continue
+                for entry in other_entries:
+                    report.write("other_only", path, entry)
+
+        report.print_summary()
+        return report.counts
+
+    @staticmethod
+    def __load_other(onto2):
+        if isinstance(onto2, LeavedOnto):
+            return onto2
+        elif isinstance(onto2, Path):
+            return LeavedOnto(onto2)
+        else:
+            raise TypeError(
+                "to_diff should be either a Path object, or a LeavedOnto object"
+            )
+
+    def __ignored_idx(self, ignore_fields):
+        return {i for i, l in enumerate(self.onto1.ont.legend) if l in ignore_fields}
+
+    @staticmethod
+    def __cleaned_key(entry, ignored_idx):
+        return tuple("" if i in ignored_idx else e for i, e in enumerate(entry))
+
     def __find_differences(self, onto2, mode="all"):
         to_ignore = ["freq", "origin"]
         # comparison is done on cleaned entries ; original entries are returned
@@ -79,100 +142,125 @@ class OntoManager:
 
         cleaned = []
         for path_, entry in entries:
-            new = deepcopy(entry)
+            new = entry
             for i in ignore_fields:
-                self.onto1.set_field_value(new, i, '', mode="replace")
+                new = self.onto1.with_field_value(new, i, '', mode="replace")
             cleaned.append((path_, new))
         return cleaned
 
-    def tag_segmented(self, in_file, out_file=None, fields=dict):
-        # fields should at least contain "pos", "levels" and "l_colors" entries
-        if 'pos' not in fields:
-            raise ValueError('"pos" entry missing in fields')
-        if 'levels' not in fields:
-            raise ValueError('"levels" entry missing in fields')
-        if 'l_colors' not in fields:
-            raise ValueError('"l_colors" entry missing in fields')
-        pos_list, levels, l_colors = fields.pop('pos'), fields.pop('levels'), fields.pop('l_colors')
-        generate_to_tag(in_file, self.onto1, pos_list, levels, l_colors, out_file=out_file, fields=fields)
+    def tag_segmented(self, in_file, out_file=None, fields=dict, cache=None, progress=None, similar=0):
+        """
+        :param similar: max edit distance of the known lemmas offered in a comment of the new words, 0 for none
+        """
+        from .tag_to_onto import generate_to_tag
 
-    def tag_segmented_chunks(self, in_file, out_file=None, line_mode="chunk", fields=dict):
-        # fields should at least contain "pos", "levels" and "l_colors" entries
-        if 'pos' not in fields:
-            raise ValueError('"pos" entry missing in fields')
-        if 'levels' not in fields:
-            raise ValueError('"levels" entry missing in fields')
-        if 'l_colors' not in fields:
-            raise ValueError('"l_colors" entry missing in fields')
-        pos_list, levels, l_colors = fields.pop('pos'), fields.pop('levels'), fields.pop('l_colors')
+        pos_list, levels, l_colors, fields = self.__split_fields(fields)
+        generate_to_tag(in_file, self.onto1, pos_list, levels, l_colors, out_file=out_file, fields=fields, cache=cache,
+                        progress=get_progress(progress), similar=similar)
 
-        # segment text into chunks
-        chunks = self.__generate_chunks(in_file, line_mode)
+    def tag_raw(self, in_file, out_file=None, fields=dict):
+        """
+        Segments an unsegmented text into the longest words of onto1 and generates its tagging sheet,
+        prefilled with the POS and level of the matched words.
+        The segmented text is written besides in_file, as <text>_segmented.txt
+        """
+        matcher = SyllableMatcher(self.onto1)
+        segmented = in_file.parent / (in_file.stem + "_segmented.txt")
+        n_lines, n_syls, seconds = matcher.segment_file(in_file, segmented)
+        print(f'{in_file.name}: segmented {n_lines} lines, {n_syls} syllables in {seconds:.2f}s '
+              f'({n_syls / seconds if seconds else 0:.0f} syllables/s)')
 
-        # write a config file that keeps the status of how each segment is parsed
-        conf_file = out_file.parent / (out_file.stem.split('_')[0] + '.config')
-        config = self.__load_chunks_config(conf_file, list(chunks.keys()))
+        if not out_file:
+            out_file = in_file.parent / (in_file.stem + "_totag.xlsx")
+        self.tag_segmented(segmented, out_file=out_file, fields=fields, cache=matcher.cache)
 
-        # process chunks and update config
-        config = generate_to_tag_chunks(chunks, config, self.onto1, line_mode, pos_list, levels, l_colors, out_file=out_file, fields=fields)
-        conf_file.write_text(yaml.safe_dump(config))
+    def tag_segmented_batch(self, in_dir, out_dir=None, workers=None, fields=dict, progress=None, similar=0):
+        """
+        Generates the <text>_totag.xlsx tagging sheets of all the .txt files of in_dir, in parallel.
+        Sheets more recent than both their text and the onto are skipped.
 
-        # return status for not
-        if 'todo' in config.values():
+        :return: list of tuple(<in_file>, <words>, <seconds>) of the processed files
+        """
+        from .batch import tag_files
+
+        pos_list, levels, l_colors, fields = self.__split_fields(fields)
+        in_dir = Path(in_dir)
+        out_dir = Path(out_dir) if out_dir else in_dir
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        onto_mtime = 0
+        if isinstance(self.onto1.ont_path, Path) and self.onto1.ont_path.is_file():
+            onto_mtime = self.onto1.ont_path.stat().st_mtime
+
+        jobs, skipped = [], 0
+        for in_file in sorted(in_dir.glob('*.txt')):
+            out_file = out_dir / (in_file.stem + "_totag.xlsx")
+            if out_file.is_file() and out_file.stat().st_mtime >= max(in_file.stat().st_mtime, onto_mtime):
+                skipped += 1
+                continue
+            jobs.append((in_file, out_file))
+
+        # the workers only need a read-only {word: (POS, level)} snapshot of the onto
+        snapshot = LookupCache.snapshot(self.onto1)
+
+        progress = get_progress(progress)
+        progress.note(f'{skipped} up to date files skipped.')
+        progress.start("tag batch", total=len(jobs))
+        processed = []
+        for in_file, words, seconds in tag_files(jobs, snapshot, pos_list, levels, l_colors, fields, workers=workers,
+                                                 similar=similar):
+            progress.note(f'{in_file.name}: {words} words in {seconds:.2f}s ({words / seconds if seconds else 0:.0f} words/s)')
+            progress.update(entries=words)
+            processed.append((in_file, words, seconds))
+        progress.finish()
+        return processed
+
+    def tag_segmented_chunks(self, in_file, out_file=None, line_mode="chunk", fields=dict, cache=None, progress=None,
+                             similar=0):
+        from .tag_to_onto import generate_to_tag_chunks, assemble_chunks
+
+        pos_list, levels, l_colors, fields = self.__split_fields(fields)
+
+        # a manifest keeps the status of how each segment is parsed, and where each chunk starts in the text
+        manifest = ChunkManifest(out_file, in_file, line_mode)
+        n_chunks = manifest.n_chunks
+
+        # stream the text from the first pending chunk on, process it into a part file and update the manifest
+        if manifest.pending:
+            progress = get_progress(progress)
+            progress.start(f"tag chunks {in_file.name}", total=n_chunks, done=n_chunks - len(manifest.pending))
+            start = min(manifest.pending)
+            chunks = iter_chunks(in_file, line_mode, start=start, offset=manifest.offset(start))
+            generate_to_tag_chunks(chunks, manifest, self.onto1, line_mode, levels, fields=fields, cache=cache,
+                                   similar=similar)
+            manifest.save()
+            progress.update()
+            progress.finish()
+
+        # return status for not. the tagging sheet is built once all chunks are processed
+        if not manifest.is_complete:
             return True
         else:
+            if not out_file.is_file():
+                assemble_chunks(manifest, pos_list, levels, out_file)
             return False
 
     @staticmethod
-    def __generate_chunks(in_file, line_mode):
-        dump = in_file.read_text().strip().strip('\ufeff')
-
-        if line_mode == "sentence":
-            chunk_size = 4  # sentences
-            units = []
-            for line in dump.split('\n'):
-                w = line.strip().split(' ')
-                units.append(w)
-        elif line_mode == "chunk":
-            chunk_size = 48  # words
-            # create list of words
-            units = []
-            for line in dump.split('\n'):
-                w = line.strip().split(' ')
-                units.append(w)
-        else:
-            raise SyntaxError('line_mode is either "sentence" or "chunk".')
-
-        # create chunks
-        chunks = {}
-        chunk = []
-        c_count = 0
-        w_count = 0
-        for unit in units:
-            if w_count < chunk_size - 1:
-                chunk.append(unit)
-                w_count += 1
-            else:
-                chunk.append(unit)
-                chunks[c_count] = chunk
-                c_count += 1
-                w_count = 0
-                chunk = []
-        if chunk:
-            chunks[c_count] = chunk
-
-        return chunks
-
-    @staticmethod
-    def __load_chunks_config(conf_file, chunks):
-        if not conf_file.is_file():
-            content = '\n'.join([f'{c}: todo' for c in chunks])
-            conf_file.write_text(content)
-            return yaml.safe_load(content)
-        else:
-            return yaml.safe_load(conf_file.read_text())
+    def __split_fields(fields):
+        # fields should at least contain "pos", "levels" and "l_colors" entries
+        if 'pos' not in fields:
+            raise ValueError('"pos" entry missing in fields')
+        if 'levels' not in fields:
+            raise ValueError('"levels" entry missing in fields')
+        if 'l_colors' not in fields:
+            raise ValueError('"l_colors" entry missing in fields')
+        fields = dict(fields)
+        pos_list, levels, l_colors = fields.pop('pos'), fields.pop('levels'), fields.pop('l_colors')
+        return pos_list, levels, l_colors, fields
 
     def onto_from_tagged(self, in_file, out_file=None):
+        from .tag_to_onto import get_entries, tagged_to_trie
+
         # first merge all ontos you want, then generate onto from tagged
 
         # load words and tags
@@ -188,7 +276,30 @@ class OntoManager:
         onto = LeavedOnto(trie, out_file)
         onto.convert2yaml(out_path=out_file)
 
-    def batch_merge_to_onto(self, ontos, in_to_organize=False):
+    def onto_from_tagged_batch(self, in_files, out_file, workers=None):
+        """
+        Generates a single onto from many tagging sheets: freqs are aggregated over all the files,
+        which are read in parallel.
+
+        :param in_files: directory containing *_totag.xlsx files, or list of files
+        """
+        from .batch import count_tagged_files
+        from .tag_to_onto import tagged_to_trie
+
+        if isinstance(in_files, str) or isinstance(in_files, Path):
+            in_files = sorted(Path(in_files).glob('*_totag.xlsx'))
+
+        tagged = count_tagged_files(in_files, workers=workers)
+        if not tagged:
+            print('no tagged word found. Please tag and rerun.')
+            return
+        tagged = [(a[0], a[1], a[2], f) for a, f in tagged.items()]
+
+        trie = tagged_to_trie(tagged, self.onto1)
+        onto = LeavedOnto(trie, Path(out_file))
+        onto.convert2yaml(out_path=Path(out_file))
+
+    def batch_merge_to_onto(self, ontos, in_to_organize=False, progress=None):
         if isinstance(ontos, str) or isinstance(ontos, Path):
             ontos = sorted(Path(ontos).glob('*.yaml'))
         elif isinstance(ontos, list):
@@ -196,9 +307,14 @@ class OntoManager:
         else:
             raise ValueError('ontos should be a str, a Path object or a list of filenames.')
 
+        progress = get_progress(progress)
+        progress.start("merge", total=len(ontos))
         for onto in ontos:
-            print(f'merging {onto}')
+            progress.note(f'merging {onto}')
+            onto = LeavedOnto(onto)
             self.merge_to_onto(onto, in_to_organize=in_to_organize)
+            progress.update(entries=onto.ont.size(), trie_size=self.onto1.ont.size())
+        progress.finish()
 
     def merge_to_onto(self, onto2, in_to_organize=False, add_origin=True):
         # add to onto1 the entries that are only in onto2
@@ -214,7 +330,13 @@ class OntoManager:
                 "\nPlease retry after that."
             )
 
-        _, shared, other_only = self.diff_ontos(onto2, mode="all")
+        # readers of a concurrent onto1 only see it before or after the whole merge
+        with self.onto1.ont.transaction():
+            self.__merge(onto2, in_to_organize, add_origin)
+
+    def __merge(self, onto2, in_to_organize, add_origin):
+        with phase("merge.diff"):
+            _, shared, other_only = self.diff_ontos(onto2, mode="all")
         shared = [s[1] for s in shared]  # only keeping entries from onto2. (shared contains both)
         to_merge = shared + other_only
 
@@ -223,21 +345,24 @@ class OntoManager:
                 path, entry = t[0], t[1]
                 origin = onto2.ont_path.stem.split("_")[0]
                 origin += f':{self.onto1.get_field_value(entry, "freq")}'
-                self.onto1.set_field_value(entry, "origin", origin)
+                # the entries of onto2 are left untouched
+                entries[i] = (path, self.onto1.with_field_value(entry, "origin", origin))
             return entries
 
-        # add origins
-        if add_origin:
-            to_merge = add_origin(to_merge)
+        with phase("merge.insert"):
+            # add origins
+            if add_origin:
+                to_merge = add_origin(to_merge)
 
-        if in_to_organize:
-            for i in range(len(to_merge)):
-                to_merge[i] = (["to_organize"] + to_merge[i][0], to_merge[i][1])
+            if in_to_organize:
+                for i in range(len(to_merge)):
+                    to_merge[i] = (["to_organize"] + to_merge[i][0], to_merge[i][1])
 
-        for path, entry in to_merge:
-            self.__merge_origins_n_add(path, entry)
+            for path, entry in to_merge:
+                self.__merge_origins_n_add(path, entry)
 
-        self.onto1._cleanup()
+        with phase("merge.cleanup"):
+            self.onto1._cleanup()
 
     def __merge_origins_n_add(self, path, entry, onto=None):
         onto = self.onto1 if not onto else onto
@@ -290,14 +415,8 @@ class OntoManager:
             onto.ont.remove_entry(path, f_e)
 
             # 2. merge origins
-            origs = defaultdict(int)
-            for o in [entry_origin, f_e_origin]:
-                for orig in o.split(' — '):
-                    a, b = orig.split(':')
-                    origs[a] += int(b)
-            origs = [f'{a}:{b}' for a, b in origs.items()]
-            merged_origs = ' — '.join(sorted(origs))
-            onto.set_field_value(f_e_clean, 'origin', merged_origs, mode='replace')
+            merged_origs = Origins.parse(entry_origin) + Origins.parse(f_e_origin)
+            f_e_clean = onto.with_field_value(f_e_clean, 'origin', merged_origs, mode='replace')
 
             # 3. merge freqs
             merged_freq = 0
@@ -308,11 +427,11 @@ class OntoManager:
                     f = 0
                     pass
                 merged_freq += f
-            onto.set_field_value(f_e_clean, 'freq', merged_freq, mode='replace')
+            f_e_clean = onto.with_field_value(f_e_clean, 'freq', merged_freq, mode='replace')
 
             # 4. merge levels: take lowest level, the first level on which the word was introduced
             merged_level = sorted([entry_level, f_e_level])[0]
-            onto.set_field_value(f_e_clean, 'level', merged_level, mode='replace')
+            f_e_clean = onto.with_field_value(f_e_clean, 'level', merged_level, mode='replace')
 
             # add new entry
             onto.ont.add(path, f_e_clean)
@@ -342,9 +461,15 @@ class OntoManager:
         if to_adjust == adjust:
             print("Please modify adjust_legends.yaml and rerun.")
 
-        self._adjust_entries(adjust["legend_orig"], adjust["legend_new"])
-        self._replace_legend(adjust["legend_new"], adjust["replacements"])
-        self.onto1.convert2yaml()
+        # the onto is left as it was if anything fails
+        snapshot = self.onto1.ont.snapshot()
+        try:
+            self._adjust_entries(adjust["legend_orig"], adjust["legend_new"])
+            self._replace_legend(adjust["legend_new"], adjust["replacements"])
+            self.onto1.convert2yaml()
+        except Exception:
+            self.onto1.ont.restore(snapshot)
+            raise
         legend_config.unlink(missing_ok=True)
 
     def _replace_legend(self, l_new, replc):
@@ -356,57 +481,31 @@ class OntoManager:
         self.onto1.ont.legend = l_new
 
     def _adjust_entries(self, l_orig, l_new):
-        queue = [self.onto1.ont.head]
-        while queue:
-            current_node = queue.pop()
-            if current_node.leaf:
-                # remove duplicates and sort in tibetan order
-                for n, entry in enumerate(current_node.data):
-                    old = {l_orig[i]: entry[i] for i in range(len(l_orig))}
-                    new = {l_new[i]: "" for i in range(len(l_new))}  # no values
-                    new = {l: old[l] if l in old else "" for l, _ in new.items()}  # with values
-                    new_entry = [new[e] for e in l_new]
-                    current_node.data[n] = new_entry
-            queue = [node for key, node in current_node.children.items()] + queue
-
-    def recompose_ontos_from_master(self, overwrite=False):
+        def adjust(entries):
+            adjusted = []
+            for entry in entries:
+                old = {l_orig[i]: entry[i] for i in range(len(l_orig))}
+                new = {l_new[i]: "" for i in range(len(l_new))}  # no values
+                new = {l: old[l] if l in old else "" for l, _ in new.items()}  # with values
+                adjusted.append([new[e] for e in l_new])
+            return adjusted
+
+        self.onto1.ont.map_leaves(adjust)
+
+    def recompose_ontos_from_master(self, overwrite=False, workers=None, progress=None):
         ontos_path = self.onto1.ont_path.parent
-        # {<level_onto>: <LeavedOnto object>, <...>: ...}  ontos to reconstruct
-        struct = {onto.stem.split('_')[0]: LeavedOnto(OntTrie(), ont_path=onto) for onto in ontos_path.rglob('*.yaml') if onto != self.onto1.ont_path}
-        # set legends, add suffix to filename if needed
-        for onto in struct.values():
-            onto.set_legend(self.onto1.ont.legend)
+        # {<level_onto>: <out_file>, <...>: ...}  ontos to reconstruct, add suffix to filename if needed
+        targets = {}
+        for onto in ontos_path.rglob('*.yaml'):
+            if onto == self.onto1.ont_path:
+                continue
             if not overwrite:
-                onto.ont_path = onto.ont_path.parent / (onto.ont_path.stem + '_updated.yaml')
+                onto = onto.parent / (onto.stem + '_updated.yaml')
+            targets[onto.stem.split('_')[0]] = onto
 
         # {<base-level onto>: [<base-level onto>, <level onto>], ...}  by which ontos a given entry should be ingested
         recompose_paths = {onto.stem.split('_')[0]: [onto.stem.split('_')[0], onto.parts[-2]] for level in ontos_path.glob('*') if level.is_dir() for onto in level.glob('*.yaml')}
 
-        # reconstruct base-level ontos
-        all_entries = self.onto1.ont.export_all_entries()
-
-        # reconstruct ontos
-        for path_, entries in all_entries:
-            for entry in entries:
-                origin = self.onto1.get_field_value(entry, 'origin')
-                for orig in origin.split(' — '):
-                    o, freq = orig.split(':')
-                    if o not in recompose_paths:
-                        continue
-
-                    freq = int(freq)
-                    for n, onto in enumerate(recompose_paths[o]):
-                        norig_entry = deepcopy(entry)
-                        self.onto1.set_field_value(norig_entry, 'freq', freq, mode='replace')
-                        if n == 0:
-                            # base-level ontos don't have origins. removing it before adding entries normally
-                            self.onto1.set_field_value(norig_entry, 'origin', '', mode='replace')
-                            struct[onto].ont.add(path_, data=norig_entry)
-                        elif n == 1:
-                            # level ontos join all base-level ontos of their level. adding origin + merging them
-                            self.onto1.set_field_value(norig_entry, 'origin', f'{o}:{freq}', mode='replace')
-                            self.__merge_origins_n_add(path_, norig_entry, onto=struct[onto])
-
-        for onto in struct.values():
-            onto.convert2yaml()
-
+        # reconstruct ontos in a single pass over the master entries, then write them in parallel
+        rc = RecomposeFromMaster(self.onto1, targets, recompose_paths)
+        rc.recompose(workers=workers, progress=progress)
@@ -0,0 +1,63 @@
+class Origins(dict):
+    """
+    In-memory representation of the "origin" field: {<origin name>: <count>}, None for the names without a count
+
+    Parsed once at load from "text1:3 — text2:5" and formatted back the same way at export, in the same order.
+    Merging origins is a dict addition: Origins(a=1) + Origins(a=2, b=1) == Origins(a=3, b=1),
+    the merged origins being sorted by name.
+    """
+    sep = " — "
+
+    @classmethod
+    def parse(cls, origin):
+        """
+        "text1:3 — text2:5"  ->  Origins({"text1": 3, "text2": 5})
+        "text1"  ->  Origins({"text1": None})
+        Origins and dicts are returned as Origins, empty values as an empty Origins
+        """
+        if isinstance(origin, cls):
+            return origin
+        if isinstance(origin, dict):
+            return cls(origin)
+
+        origins = cls()
+        if not origin:
+            return origins
+
+        for orig in str(origin).split(cls.sep):
+            name, _, count = orig.rpartition(":")
+            try:
+                count = int(count)
+            except ValueError:
+                name, count = orig, None
+            if not name:
+                name, count = orig, None
+            origins[name] = add_counts(origins.get(name), count)
+        return origins
+
+    @property
+    def freq(self):
+        return sum(count for count in self.values() if count)
+
+    def __add__(self, other):
+        merged = Origins(self)
+        for name, count in Origins.parse(other).items():
+            merged[name] = add_counts(merged.get(name), count)
+        return Origins(sorted(merged.items()))
+
+    def __str__(self):
+        return self.sep.join(name if count is None else f"{name}:{count}" for name, count in self.items())
+
+
+def add_counts(count, other):
+    # names without a count stay without one until they are given one
+    if count is None and other is None:
+        return None
+    return (count or 0) + (other or 0)
+
+
+def format_entry(entry):
+    """
+    entry with its Origins formatted back to strings, as written on disk
+    """
+    return [str(e) if isinstance(e, Origins) else e for e in entry]
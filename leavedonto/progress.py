@@ -0,0 +1,101 @@
+import sys
+import time
+
+
+class Progress:
+    """
+    Progress and throughput of long-running operations, reported phase by phase. Silent: use it in library code.
+
+    The operations call start() at the beginning of each phase, update() as items are processed and finish()
+    at the end of the phase. Subclasses only need to implement report(), which receives metrics() at most
+    every <interval> seconds and at the end of each phase.
+    """
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.phase = None
+        self.total = None
+        self.items = 0
+        self.entries = 0
+        self.start_time = None
+        self.last_report = None
+        self.peak_trie_size = 0
+
+    def start(self, phase, total=None, done=0):
+        """
+        :param total: number of items of the phase, if known. used to estimate the remaining time
+        :param done: items already processed in a previous run, e.g. chunks of a resumed tagging
+        """
+        self.phase = phase
+        self.total = total
+        self.items = done
+        self.entries = 0
+        self.start_time = self.last_report = time.perf_counter()
+
+    def update(self, items=1, entries=0, trie_size=None):
+        self.items += items
+        self.entries += entries
+        if trie_size is not None and trie_size > self.peak_trie_size:
+            self.peak_trie_size = trie_size
+
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(self.metrics())
+
+    def finish(self):
+        metrics = self.metrics()
+        metrics["done"] = True
+        self.report(metrics)
+
+    def note(self, message):
+        pass
+
+    def metrics(self):
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        eta = None
+        if self.total and self.items:
+            eta = elapsed / self.items * (self.total - self.items)
+        return {
+            "phase": self.phase,
+            "items": self.items,
+            "total": self.total,
+            "entries": self.entries,
+            "elapsed": elapsed,
+            "items_per_s": self.items / elapsed if elapsed else 0.0,
+            "entries_per_s": self.entries / elapsed if elapsed else 0.0,
+            "eta": eta,
+            "peak_trie_size": self.peak_trie_size,
+            "done": False,
+        }
+
+    def report(self, metrics):
+        pass
+
+
+class StderrProgress(Progress):
+    """
+    Logs one line per report to stderr. Pass it to the long-running operations to follow them
+    """
+    def __init__(self, interval=5.0, stream=None):
+        super().__init__(interval=interval)
+        self.stream = stream
+
+    def note(self, message):
+        print(message, file=self.stream or sys.stderr)
+
+    def report(self, metrics):
+        items = f'{metrics["items"]}/{metrics["total"]}' if metrics["total"] else str(metrics["items"])
+        line = f'{metrics["phase"]}: {items} items, {metrics["entries"]} entries in {metrics["elapsed"]:.2f}s ' \
+               f'({metrics["entries_per_s"]:.0f} entries/s)'
+        if metrics["done"]:
+            line += " done"
+        elif metrics["eta"] is not None:
+            line += f', ~{metrics["eta"]:.0f}s left'
+        if metrics["peak_trie_size"]:
+            line += f', peak trie size: {metrics["peak_trie_size"]} entries'
+        print(line, file=self.stream or sys.stderr)
+
+
+def get_progress(progress):
+    # operations are silent unless given a reporter
+    return progress if progress is not None else Progress()
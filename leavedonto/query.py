@@ -0,0 +1,324 @@
+"""
+Queries on the fields of the entries, e.g. all the verbs of level A1 with a freq above 10:
+
+    onto.query({"level": "A1", "freq": (">", 10)}, prefix=["VERB"])
+
+A condition is either a value (equality) or a tuple(<op>, <args>):
+    ("in", [<value>, ...])      one of the values
+    ("range", <low>, <high>)    low <= value <= high, None for an open bound
+    (">", <value>), (">=", <value>), ("<", <value>), ("<=", <value>)
+    ("prefix", <string>)
+
+Numbers and numeric strings are compared as numbers. An origin field matches the names of its origins:
+{"origin": "text1"} finds the entries of text1.
+
+The same conditions filter the ranked queries: onto.top_words(20, prefix=["NOUN"], where={"level": "A1"})
+"""
+import bisect
+
+# numbers sort before strings, so that all the keys of a field are comparable
+NUM, STR = 0, 1
+MAX_CHAR = "\U0010ffff"
+OPS = ["==", "in", "range", ">", ">=", "<", "<=", "prefix"]
+
+
+def field_key(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return NUM, float(value)
+    value = "" if value is None else str(value)
+    try:
+        return NUM, float(value)
+    except ValueError:
+        return STR, value
+
+
+def field_keys(value):
+    # Origins are indexed by the names of the origins
+    if isinstance(value, dict):
+        return [(STR, str(name)) for name in value]
+    return [field_key(value)]
+
+
+class Predicate:
+    def __init__(self, field, condition):
+        self.field = field
+        if isinstance(condition, tuple) and condition and condition[0] in OPS:
+            self.op, args = condition[0], condition[1:]
+        else:
+            self.op, args = "==", (condition,)
+
+        self.keys = None
+        # bounds of the range conditions: tuple(<key>, <inclusive>)
+        self.low, self.high = ((NUM, float("-inf")), True), ((NUM, float("inf")), True)
+        if self.op == "==":
+            self.keys = {field_key(args[0])}
+        elif self.op == "in":
+            self.keys = {field_key(v) for v in args[0]}
+        elif self.op == "prefix":
+            self.low, self.high = ((STR, args[0]), True), ((STR, args[0] + MAX_CHAR), True)
+        elif self.op == "range":
+            low, high = args
+            if low is not None:
+                self.low = (NUM, float(low)), True
+            if high is not None:
+                self.high = (NUM, float(high)), True
+        elif self.op in [">", ">="]:
+            self.low = (NUM, float(args[0])), self.op == ">="
+        else:
+            self.high = (NUM, float(args[0])), self.op == "<="
+
+    def match(self, value):
+        for key in field_keys(value):
+            if self.keys is not None:
+                if key in self.keys:
+                    return True
+            elif self.__above_low(key) and self.__below_high(key):
+                return True
+        return False
+
+    def __above_low(self, key):
+        low, inclusive = self.low
+        return key >= low if inclusive else key > low
+
+    def __below_high(self, key):
+        high, inclusive = self.high
+        return key <= high if inclusive else key < high
+
+
+class FieldIndex:
+    """
+    Secondary index of a legend field: {<key>: {(<id of entry>, <path>): tuple(<path>, <entry>)}}, and the sorted
+    keys for the range and prefix conditions. It is registered in an OntTrie, which keeps it current.
+    """
+    def __init__(self, field):
+        self.field = field
+        self.buckets = {}
+        self.keys = []
+        # {(<id of entry>, <path>): <keys>}: keys under which each entry was indexed
+        self.members = {}
+        self.idx = None
+        self.stale = True
+
+    def rebuild(self, trie):
+        self.idx = trie.legend.index(self.field)
+        self.buckets, self.members = {}, {}
+        for path, entries in trie.iter_leaves():
+            self.__add(path, entries)
+        self.keys = sorted(self.buckets)
+        self.stale = False
+
+    def reset(self):
+        # rebuilt before the next lookup
+        self.stale = True
+
+    def copy(self):
+        new = FieldIndex(self.field)
+        if not self.stale:
+            new.idx, new.stale = self.idx, False
+            new.buckets = {key: dict(bucket) for key, bucket in self.buckets.items()}
+            new.keys, new.members = list(self.keys), dict(self.members)
+        return new
+
+    def add(self, path, entries):
+        if not self.stale:
+            for key in self.__add(path, entries):
+                bisect.insort(self.keys, key)
+
+    def __add(self, path, entries):
+        new_keys = []
+        path = tuple(path)
+        for entry in entries:
+            member = (id(entry), path)
+            keys = field_keys(entry[self.idx] if len(entry) > self.idx else "")
+            self.members[member] = keys
+            for key in keys:
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    bucket = self.buckets[key] = {}
+                    new_keys.append(key)
+                bucket[member] = (list(path), entry)
+        return new_keys
+
+    def remove(self, path, entries):
+        if self.stale:
+            return
+        path = tuple(path)
+        for entry in entries:
+            # removed under the keys it was indexed with
+            member = (id(entry), path)
+            for key in self.members.pop(member, []):
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    continue
+                bucket.pop(member, None)
+                if not bucket:
+                    del self.buckets[key]
+                    del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def lookup(self, predicate):
+        """
+        :return: the buckets of the entries that may satisfy predicate
+        """
+        if predicate.keys is not None:
+            return [self.buckets[key] for key in predicate.keys if key in self.buckets]
+
+        (low, low_inclusive), (high, high_inclusive) = predicate.low, predicate.high
+        start = bisect.bisect_left(self.keys, low) if low_inclusive else bisect.bisect_right(self.keys, low)
+        end = bisect.bisect_right(self.keys, high) if high_inclusive else bisect.bisect_left(self.keys, high)
+        return [self.buckets[key] for key in self.keys[start:end]]
+
+
+class RankIndex:
+    """
+    Entries ordered by the numeric value of a field, the highest first, in each category subtree:
+    {<category>: sorted list of tuple(-<value>, <lemma>, <path>, <id of entry>)}, the whole trie being the category ().
+    Entries without a numeric value are left out. It is registered in an OntTrie, which keeps it current.
+    """
+    def __init__(self, field="freq"):
+        self.field = field
+        self.ranks = {}
+        self.entries = {}  # {(<path>, <id of entry>): tuple(<key it is ranked under>, <entry>)}
+        self.idx = None
+        self.stale = True
+
+    def rebuild(self, trie):
+        self.idx = trie.legend.index(self.field)
+        self.ranks, self.entries = {}, {}
+        for path, entries in trie.iter_leaves():
+            self.__add(path, entries, insort=False)
+        for ranks in self.ranks.values():
+            ranks.sort()
+        self.stale = False
+
+    def reset(self):
+        self.stale = True
+
+    def copy(self):
+        new = RankIndex(self.field)
+        if not self.stale:
+            new.idx, new.stale = self.idx, False
+            new.ranks = {prefix: list(ranks) for prefix, ranks in self.ranks.items()}
+            new.entries = dict(self.entries)
+        return new
+
+    def add(self, path, entries):
+        if not self.stale:
+            self.__add(path, entries, insort=True)
+
+    def __add(self, path, entries, insort):
+        path = tuple(path)
+        for entry in entries:
+            key = self.__key(path, entry)
+            if key is None:
+                continue
+            self.entries[key[2:]] = (key, entry)
+            for i in range(len(path) + 1):
+                ranks = self.ranks.setdefault(path[:i], [])
+                if insort:
+                    bisect.insort(ranks, key)
+                else:
+                    ranks.append(key)
+
+    def remove(self, path, entries):
+        if self.stale:
+            return
+        path = tuple(path)
+        for entry in entries:
+            # removed under the key it was ranked with
+            ranked = self.entries.pop((path, id(entry)), None)
+            if ranked is None:
+                continue
+            key = ranked[0]
+            for i in range(len(path) + 1):
+                ranks = self.ranks[path[:i]]
+                del ranks[bisect.bisect_left(ranks, key)]
+                if not ranks:
+                    del self.ranks[path[:i]]
+
+    def __key(self, path, entry):
+        kind, value = field_key(entry[self.idx] if len(entry) > self.idx else "")
+        if kind != NUM:
+            return None
+        return -value, str(entry[0]), path, id(entry)
+
+    def top(self, k, prefix=(), matches=None):
+        """
+        :return: the k entries of the category with the highest values, as tuple(path, entry)
+        """
+        found = []
+        for key in self.ranks.get(tuple(prefix), []):
+            if len(found) == k:
+                break
+            entry = self.entries[key[2:]][1]
+            if matches is None or matches(entry):
+                found.append((list(key[2]), entry))
+        return found
+
+    def above(self, threshold, prefix=(), matches=None):
+        """
+        :return: the entries of the category whose value is at least threshold, the highest first
+        """
+        ranks = self.ranks.get(tuple(prefix), [])
+        end = bisect.bisect_right(ranks, (-float(threshold), MAX_CHAR))
+        found = []
+        for key in ranks[:end]:
+            entry = self.entries[key[2:]][1]
+            if matches is None or matches(entry):
+                found.append((list(key[2]), entry))
+        return found
+
+
+def compile_where(legend, where):
+    """
+    :return: function telling if an entry satisfies all the conditions of where, and the list of the predicates
+    """
+    predicates = []
+    for field, condition in (where or {}).items():
+        if field not in legend:
+            raise IndexError(f"{field} not contained in legend:\n{legend}")
+        predicates.append((legend.index(field), Predicate(field, condition)))
+
+    def matches(entry):
+        return all(predicate.match(entry[idx] if len(entry) > idx else "") for idx, predicate in predicates)
+
+    return matches, [predicate for _, predicate in predicates]
+
+
+def run_query(trie, where, prefix=None):
+    """
+    Entries under prefix satisfying all the conditions of where, see the module docstring.
+
+    The planner starts from the smallest set of candidates: the entries under prefix, or the entries given by
+    the index of one of the queried fields. Every candidate is then checked against all the conditions.
+
+    :return: list of tuple(<path>, <entries>), in the order of find_entries() unless an index is used
+    """
+    matches, predicates = compile_where(trie.legend, where)
+    prefix = [prefix] if isinstance(prefix, str) else list(prefix) if prefix else []
+
+    best, candidates = trie.count_entries(prefix), None
+    for predicate in predicates:
+        index = trie.get_index(predicate.field)
+        if index is None:
+            continue
+        buckets = index.lookup(predicate)
+        size = sum(len(bucket) for bucket in buckets)
+        if size < best:
+            best, candidates = size, buckets
+
+    if candidates is not None:
+        found, seen = {}, set()
+        for bucket in candidates:
+            for key, (path, entry) in bucket.items():
+                if key in seen or path[:len(prefix)] != prefix or not matches(entry):
+                    continue
+                seen.add(key)
+                found.setdefault(key[1], (path, []))[1].append(entry)
+        return list(found.values())
+
+    found = []
+    for path, entries in trie.find_entries(prefix=prefix):
+        entries = [entry for entry in entries if matches(entry)]
+        if entries:
+            found.append((path, entries))
+    return found
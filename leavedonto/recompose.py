@@ -0,0 +1,157 @@
+import os
+from collections import defaultdict
+
+from .leavedonto import LeavedOnto
+from .origins import Origins
+from .progress import Progress, get_progress
+from .trie import OntTrie
+
+
+def write_onto(trie, out_file):
+    # cleans up (dedup + sort) and writes an onto. module-level to be usable in worker processes
+    onto = LeavedOnto(trie, ont_path=out_file)
+    onto.convert2yaml(out_path=out_file, progress=Progress())
+    return out_file
+
+
+class RecomposeFromMaster:
+    """
+    Rebuilds the base-level and level ontos from the origins of the entries of a master onto.
+
+    All master entries are bucketed by target onto in a single pass:
+        - base-level ontos receive the entry with the freq of their origin and no origin
+        - level ontos receive one entry per group of entries that only differ in origin, freq and level,
+          with merged origins, the freq derived from them and the lowest level
+    Each target trie is then built with bulk inserts, and the ontos are written in parallel.
+    """
+    merged_fields = ["origin", "freq", "level"]
+
+    def __init__(self, master, targets, recompose_paths):
+        """
+        :param master: LeavedOnto
+        :param targets: {<onto name>: <out_file>} ontos to reconstruct
+        :param recompose_paths: {<base-level onto>: [<base-level onto>, <level onto>]}
+        """
+        self.master = master
+        self.legend = master.ont.legend
+        self.targets = targets
+        self.recompose_paths = recompose_paths
+
+        self.idx = {field: self.legend.index(field) for field in self.merged_fields if field in self.legend}
+        if "origin" not in self.idx or "freq" not in self.idx:
+            raise SyntaxError('the legend should contain "origin" and "freq" to recompose ontos.')
+
+        # {<onto>: {<path>: [<entry>, ...]}}
+        self.base_buckets = defaultdict(lambda: defaultdict(list))
+        # {<onto>: {(<path>, <entry without merged fields>): [<entry>, <origins>, <level>]}}
+        self.level_buckets = defaultdict(dict)
+
+    def recompose(self, workers=None, progress=None):
+        progress = get_progress(progress)
+        self.partition(progress=progress)
+        tries = self.build_tries(progress=progress)
+        return self.write(tries, workers=workers, progress=progress)
+
+    def partition(self, progress=None):
+        progress = progress if progress else Progress()
+        origin_idx, freq_idx = self.idx["origin"], self.idx["freq"]
+        level_idx = self.idx.get("level")
+
+        progress.start("partition", total=sum(1 for _ in self.master.ont.iter_leaves()))
+        for path_, entries in self.master.ont.iter_leaves():
+            progress.update(entries=len(entries))
+            path_ = tuple(path_)
+            for entry in entries:
+                origins = Origins.parse(self.__field(entry, origin_idx))
+                key = None
+                for o, freq in origins.items():
+                    if o not in self.recompose_paths:
+                        continue
+
+                    base, level = self.recompose_paths[o]
+                    if base in self.targets:
+                        new = self.__padded(entry)
+                        new[freq_idx] = freq
+                        new[origin_idx] = Origins()
+                        self.base_buckets[base][path_].append(new)
+
+                    if level in self.targets:
+                        if key is None:
+                            key = (path_, tuple(e for i, e in enumerate(self.__padded(entry))
+                                                if i not in self.idx.values()))
+                        self.__add_to_level(level, key, entry, o, freq, level_idx)
+        progress.finish()
+
+    def __add_to_level(self, level, key, entry, o, freq, level_idx):
+        bucket = self.level_buckets[level]
+        if key not in bucket:
+            entry_level = self.__field(entry, level_idx) if level_idx is not None else None
+            bucket[key] = [self.__padded(entry), Origins(), entry_level]
+        merged = bucket[key]
+        merged[1] += {o: freq}
+        if level_idx is not None:
+            # take lowest level, the first level on which the word was introduced
+            merged[2] = sorted([merged[2], self.__field(entry, level_idx)])[0]
+
+    def build_tries(self, progress=None):
+        progress = progress if progress else Progress()
+        tries = {name: self.__new_trie() for name in self.targets}
+
+        progress.start("build", total=len(self.base_buckets) + len(self.level_buckets))
+        for name, bucket in self.base_buckets.items():
+            size = 0
+            for path_, entries in bucket.items():
+                tries[name].add_entries(list(path_), entries)
+                size += len(entries)
+            progress.update(entries=size, trie_size=size)
+
+        origin_idx, freq_idx = self.idx["origin"], self.idx["freq"]
+        level_idx = self.idx.get("level")
+        for name, bucket in self.level_buckets.items():
+            by_path = defaultdict(list)
+            for (path_, _), (entry, origins, level) in bucket.items():
+                entry[origin_idx] = origins
+                entry[freq_idx] = origins.freq
+                if level_idx is not None:
+                    entry[level_idx] = level
+                by_path[path_].append(entry)
+            for path_, entries in by_path.items():
+                tries[name].add_entries(list(path_), entries)
+            progress.update(entries=len(bucket), trie_size=len(bucket))
+        progress.finish()
+
+        return tries
+
+    def write(self, tries, workers=None, progress=None):
+        progress = progress if progress else Progress()
+        workers = workers if workers else os.cpu_count()
+        jobs = [(tries[name], self.targets[name]) for name in self.targets]
+        progress.start("write", total=len(jobs))
+
+        written = []
+        if workers <= 1 or len(jobs) <= 1:
+            for trie, out_file in jobs:
+                written.append(write_onto(trie, out_file))
+                progress.update()
+        else:
+            from concurrent.futures import ProcessPoolExecutor  # only needed to write in parallel
+
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                for out_file in executor.map(write_onto, *zip(*jobs)):
+                    written.append(out_file)
+                    progress.update()
+        progress.finish()
+        return written
+
+    def __new_trie(self):
+        trie = OntTrie()
+        trie.legend = self.legend
+        return trie
+
+    def __padded(self, entry):
+        # copy of the entry, with one field per legend element
+        return list(entry) + [""] * (len(self.legend) - len(entry))
+
+    @staticmethod
+    def __field(entry, idx):
+        return entry[idx] if idx < len(entry) else ""
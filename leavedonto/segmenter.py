@@ -0,0 +1,90 @@
+import re
+import time
+
+from .chunker import iter_lines
+from .lookup_cache import LookupCache
+
+# a syllable with its tsek, a run of punctuation, or any other non-space character
+SYLLABLES = re.compile(r"[^\s\u0F0B-\u0F14]+[\u0F0B\u0F0C]?|[\u0F0D-\u0F14]+|\S")
+TSEKS = "\u0F0B\u0F0C"
+
+
+def syllabify(string):
+    return SYLLABLES.findall(string)
+
+
+class SyllableMatcher:
+    """
+    Maximal-munch matcher built from the lemmas of an onto, keyed by syllables (without their tsek).
+
+    Raw lines are segmented into the longest known words, each word being pre-tagged with the POS and level
+    of the first entry of its lemma. Unknown syllables are kept as one-syllable words without tags.
+    """
+    def __init__(self, onto):
+        # {<lemma>: (<POS>, <level>)}, also used to prefill the tagging sheets of the segmented texts
+        self.cache = LookupCache.snapshot(onto)
+        self.trie = {}
+        for lemma, tags in self.cache.cache.items():
+            self.__add(lemma, tags)
+
+    def __add(self, lemma, tags):
+        node = self.trie
+        for syl in syllabify(lemma):
+            node = node.setdefault(syl.rstrip(TSEKS), {})
+        # keep the first lemma of a given sequence of syllables
+        node.setdefault(None, tags)
+
+    def segment(self, line):
+        """
+        :return: list of tuple(<word>, <POS>, <level>), POS and level being None for unknown words
+        """
+        return self.__segment(syllabify(line))
+
+    def __segment(self, syls):
+        keys = [syl.rstrip(TSEKS) for syl in syls]
+
+        words = []
+        i = 0
+        while i < len(syls):
+            # walk the trie as far as possible, remembering the last complete word
+            node, end, tags = self.trie, i + 1, None
+            for j in range(i, len(syls)):
+                node = node.get(keys[j])
+                if node is None:
+                    break
+                if None in node:
+                    end, tags = j + 1, node[None]
+
+            word = "".join(syls[i:end])
+            if tags:
+                # the surface form may differ from the lemma, e.g. no final tsek before a shad
+                self.cache.cache.setdefault(word, tags)
+                words.append((word, tags[0], tags[1]))
+            else:
+                words.append((word, None, None))
+            i = end
+        return words
+
+    def iter_pretagged(self, in_file):
+        """
+        Streams in_file line by line, yielding the pre-tagged rows of each line
+        """
+        for line in iter_lines(in_file):
+            yield self.segment(" ".join(line))
+
+    def segment_file(self, in_file, out_file):
+        """
+        Writes in_file as a segmented text, one line per input line, words separated by spaces.
+
+        :return: tuple(<lines>, <syllables>, <seconds>)
+        """
+        start = time.perf_counter()
+        n_lines, n_syls = 0, 0
+        with open(out_file, "w", encoding="utf-8") as f:
+            for line in iter_lines(in_file):
+                syls = syllabify(" ".join(line))
+                words = self.__segment(syls)
+                n_lines += 1
+                n_syls += len(syls)
+                f.write(" ".join(w for w, _, _ in words) + "\n")
+        return n_lines, n_syls, time.perf_counter() - start
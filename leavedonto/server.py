@@ -0,0 +1,236 @@
+"""
+Resident lookup server: loads an onto once and answers queries over a local socket.
+
+The protocol is one JSON object per line in both directions:
+    -> {"op": "find_word", "word": "ཁྱི་"}
+    <- {"ok": true, "result": [[["NOUN", "animals"], [["ཁྱི་", "NOUN", "A0", 3, "text1:3"]]]]}
+
+usage: python -m leavedonto.server <onto> [--socket <path> | --port <port>]
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+from .leavedonto import LeavedOnto
+from .origins import format_entry
+
+
+def _formatted(found):
+    return [(path, [format_entry(e) for e in entries]) for path, entries in found]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                response = {"ok": True, "result": self.server.onto_server.answer(request)}
+            except Exception as e:  # errors are reported to the client, the connection stays open
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class OntoServer:
+    """
+    Answers find_word, find_words (batch), find_entries (prefix and category) and legend requests.
+
+    The onto file is checked for changes every <check_interval> seconds, and loaded once it stayed unchanged
+    for a whole interval. It is loaded aside, then swapped in: every request is answered by either the old or
+    the new onto, never by a partial one. If the file can't be loaded, the old onto keeps being served.
+
+    Writers should write the onto to a temporary file and rename it into place, as convert2yaml() does:
+    a file still being written may be valid yaml, only missing its end.
+    """
+    def __init__(self, onto_path, socket_path=None, host="127.0.0.1", port=0, check_interval=1.0):
+        self.onto_path = Path(onto_path)
+        self.onto = LeavedOnto(self.onto_path)
+        self.signature = self.__signature()
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.__stop = threading.Event()
+
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            self.server = _UnixServer(str(socket_path), _Handler)
+            self.address = str(socket_path)
+        else:
+            self.server = _TCPServer((host, port), _Handler)
+            self.address = self.server.server_address
+        self.server.onto_server = self
+
+    def answer(self, request):
+        onto = self.onto  # the same onto answers the whole request, even if a reload happens meanwhile
+        op = request.get("op")
+        if op == "find_word":
+            return _formatted(onto.find_word(request["word"]))
+        elif op == "find_words":
+            return {word: _formatted(onto.find_word(word)) for word in request["words"]}
+        elif op == "find_entries":
+            found = onto.ont.find_entries(
+                prefix=request.get("prefix"), lemma=request.get("lemma"), mode=request.get("mode", "entries")
+            )
+            if request.get("mode", "entries") == "lemmas":
+                return found
+            return _formatted(found)
+        elif op == "legend":
+            return onto.ont.legend
+        elif op == "reload":
+            return self.reload()
+        elif op == "ping":
+            return {"onto": str(self.onto_path), "reloads": self.reloads}
+        else:
+            raise ValueError(f'unknown op "{op}"')
+
+    def reload(self):
+        """
+        Loads the onto file if it changed since the last load. Returns True if the onto was replaced.
+        The current onto is kept if the load raises, or if the file was modified during the load.
+        """
+        signature = self.__signature()
+        if signature == self.signature:
+            return False
+        onto = LeavedOnto(self.onto_path)
+        if self.__signature() != signature:
+            # still being written: loaded at a later check
+            return False
+        self.onto, self.signature = onto, signature
+        self.reloads += 1
+        return True
+
+    def __signature(self):
+        stat = self.onto_path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def __watch(self):
+        seen = None
+        while not self.__stop.wait(self.check_interval):
+            try:
+                signature = self.__signature()
+                if signature != seen:
+                    # modified since the previous check: it may still be being written
+                    seen = signature
+                    continue
+                self.reload()
+            except Exception as e:  # a broken file is reported, the current onto keeps being served
+                print(f"could not reload {self.onto_path}: {e}", file=sys.stderr)
+
+    def serve_forever(self):
+        threading.Thread(target=self.__watch, daemon=True).start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.__stop.set()
+
+    def start(self):
+        """
+        Serves from a background thread, e.g. for tests or to embed the server in another process
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.__stop.set()
+        self.server.shutdown()
+        self.server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class OntoClient:
+    """
+    Client of an OntoServer, with the query methods of LeavedOnto. Origins are returned formatted, as in the onto files.
+
+    :param address: path of a Unix socket or tuple(<host>, <port>)
+    """
+    def __init__(self, address, timeout=None):
+        if isinstance(address, (str, Path)):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(str(address))
+        else:
+            self.sock = socket.create_connection(tuple(address))
+        self.sock.settimeout(timeout)
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, op, **params):
+        self.file.write(json.dumps({"op": op, **params}, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("the server closed the connection")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise ValueError(response["error"])
+        return response["result"]
+
+    def find_word(self, word):
+        return [(path, entries) for path, entries in self.request("find_word", word=word)]
+
+    def find_words(self, words):
+        """
+        Batch version of find_word(): {<word>: <results of find_word(word)>} in a single request
+        """
+        found = self.request("find_words", words=list(words))
+        return {word: [(path, entries) for path, entries in res] for word, res in found.items()}
+
+    def find_entries(self, prefix=None, lemma=None, mode="entries"):
+        found = self.request("find_entries", prefix=prefix, lemma=lemma, mode=mode)
+        return [(path, entries) for path, entries in found]
+
+    @property
+    def legend(self):
+        return self.request("legend")
+
+    def reload(self):
+        return self.request("reload")
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="serves lookups in an onto over a local socket")
+    parser.add_argument("onto", help=".yaml or .xlsx onto")
+    parser.add_argument("--socket", help="path of the Unix socket to listen on")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--check-interval", type=float, default=1.0, help="seconds between checks of the onto file")
+    args = parser.parse_args(argv)
+
+    server = OntoServer(args.onto, socket_path=args.socket, host=args.host, port=args.port,
+                        check_interval=args.check_interval)
+    print(f"serving {args.onto} on {server.address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from .segmenter import syllabify, TSEKS
+
+
+def split_syls(word):
+    return [syl.rstrip(TSEKS) for syl in syllabify(word)]
+
+
+class LemmaIndex:
+    """
+    Lemmas in a character trie and in a syllable trie, searched within a bounded edit distance.
+
+    The search computes one row of the Levenshtein matrix per trie node, from the row of its parent.
+    A branch is left as soon as all the values of its row exceed the maximal distance, so that only the
+    prefixes close to the searched word are visited, whatever the number of lemmas.
+
+    At "char" granularity, a missing or extra tsek counts as one edit. At "syllable" granularity, tseks are
+    ignored and a whole syllable is one edit.
+    """
+    def __init__(self, lemmas=()):
+        self.chars = {}
+        self.syls = {}
+        for lemma in lemmas:
+            self.add(lemma)
+
+    @classmethod
+    def from_onto(cls, onto):
+        return cls(entry[0] for _, entries in onto.ont.iter_leaves() for entry in entries)
+
+    def add(self, lemma):
+        node = self.chars
+        for char in lemma:
+            node = node.setdefault(char, {})
+        node[None] = [lemma]
+
+        node = self.syls
+        for syl in split_syls(lemma):
+            node = node.setdefault(syl, {})
+        lemmas = node.setdefault(None, [])
+        if lemma not in lemmas:
+            lemmas.append(lemma)
+
+    def search(self, word, max_distance=1, granularity="char"):
+        """
+        :return: list of tuple(<lemma>, <distance>), the closest first
+        """
+        if granularity == "char":
+            root, keys = self.chars, list(word)
+        elif granularity == "syllable":
+            root, keys = self.syls, split_syls(word)
+        else:
+            raise ValueError('granularity should be either "char" or "syllable".')
+
+        found = []
+        stack = [(child, key, list(range(len(keys) + 1))) for key, child in root.items() if key is not None]
+        while stack:
+            node, key, parent_row = stack.pop()
+            row = [parent_row[0] + 1]
+            for i in range(1, len(keys) + 1):
+                cost = 0 if keys[i - 1] == key else 1
+                row.append(min(row[i - 1] + 1, parent_row[i] + 1, parent_row[i - 1] + cost))
+
+            if None in node and row[-1] <= max_distance:
+                found.extend((lemma, row[-1]) for lemma in node[None])
+            if min(row) <= max_distance:
+                stack.extend((child, k, row) for k, child in node.items() if k is not None)
+
+        return sorted(found, key=lambda x: (x[1], x[0]))
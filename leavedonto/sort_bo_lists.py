@@ -1,24 +1,47 @@
+from functools import lru_cache
+
 from tibetan_sort import TibetanSort
 
 
+# a single collator shared process-wide: its trie is built lazily on the first key computed
+_collator = TibetanSort()
+
+
+@lru_cache(maxsize=2 ** 16)
+def bo_sort_key(string):
+    """
+    Returns a comparable sort key for a Tibetan (or latin) string.
+
+    Keys follow TibetanSort.compare(): the string is read as a sequence of longest matches,
+    each giving a (primary, secondary) weight. Comparing two keys gives the same result as
+    comparing the two strings with TibetanSort.compare().
+    Keys are memoized in a bounded LRU cache.
+    """
+    if _collator.trie is None:
+        _collator._build_trie()
+
+    key = []
+    offset = 0
+    while True:
+        n_chars, primary, secondary = _collator._get_longest_match(string, offset)
+        if n_chars < 1:
+            break
+        key.append((primary, secondary))
+        offset += n_chars
+    return tuple(key)
+
+
+def entry_sort_key(entry):
+    """
+    Sort key of an entry: its first four fields, each compared in Tibetan order.
+    """
+    return tuple(bo_sort_key("" if field is None else str(field)) for field in entry[:4])
+
+
 class SortBoLists(TibetanSort):
     def __init__(self):
         super().__init__()
 
-    def sort_list_of_lists(self, list_of_lists):
-        # extract first four elements + append position
-        first_els = []
-        for n, list_ in enumerate(list_of_lists):
-            max = 4 if len(list_) >= 4 else len(list_)
-            els = [list_[i] if len(list_) >= i else '' for i in range(max)]
-            first_els.append(f"{''.join(els)}—{n}")
-        sorted_firsts = self.sort_list(first_els)
-
-        # use position from sorted first elements to sort lists
-        sorted_ = []
-        for el in sorted_firsts:
-            _, num = el.split("—")
-            num = int(num)
-            sorted_.append(list_of_lists[num])
-
-        return sorted_
+    @staticmethod
+    def sort_list_of_lists(list_of_lists):
+        return sorted(list_of_lists, key=entry_sort_key)
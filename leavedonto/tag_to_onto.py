@@ -1,23 +1,37 @@
-from collections import defaultdict
+import json
+from collections import Counter
+from itertools import islice
 
 from openpyxl import Workbook, load_workbook
+from openpyxl.comments import Comment
 from openpyxl.styles import Font, Alignment, PatternFill, Protection
-from openpyxl.utils import coordinate_to_tuple
 
 from .trie import OntTrie
 from .dataval import DataVal
+from .lookup_cache import LookupCache
+from .chunker import iter_lines, iter_rows
 from .utils import resize_sheet
+from .instrument import timed
+from .progress import Progress
 
 
 def tagged_to_trie(tagged, onto_basis):
     trie = OntTrie()
     trie.legend = onto_basis.ont.legend
+
+    # compiled entry template: position in the legend of each tagged part
+    template = [""] * len(trie.legend)
+    idx = {part: trie.legend.index(part) for part in ["word", "POS", "level", "freq"] if part in trie.legend}
+
+    paths = first_paths_index(onto_basis.ont)
     for word, pos, level, freq in tagged:
-        parts = {"word": word, "POS": pos, "level": level, "freq": freq}
-        entry = [parts[l] if l in parts else "" for l in onto_basis.ont.legend]
-        found = onto_basis.ont.find_entries(prefix=pos, lemma=word)
-        if found:
-            found_path = found[0][0]  # choose path of first found entry
+        entry = list(template)
+        for part, value in zip(["word", "POS", "level", "freq"], [word, pos, level, freq]):
+            if part in idx:
+                entry[idx[part]] = value
+
+        found_path = paths.get((pos, word))  # path of first found entry
+        if found_path:
             trie.add(found_path, entry)
         else:
             path = [pos, "to_organize"]
@@ -25,28 +39,64 @@ def tagged_to_trie(tagged, onto_basis):
     return trie
 
 
+def first_paths_index(trie):
+    """
+    {(<top-level category>, <lemma>): <path>} with the path of the first entry found by
+    trie.find_entries(prefix=<top-level category>, lemma=<lemma>), built in a single walk
+    """
+    index = {}
+    for path, entries in trie.iter_leaves():
+        for entry in entries:
+            index.setdefault((path[0], entry[0]), path)
+    return index
+
+
 def get_entries(in_file):
-    wb = load_workbook(in_file)
-    ws = wb.active
-
-    # from sheet to list of lists
-    tagged = defaultdict(int)
-    max_row, max_col = coordinate_to_tuple(ws.dimensions.split(":")[1])
-    for r in range(1, max_row + 1, 4):
-        for col in range(1, max_col + 1):
-            # ignoring the first column containing the numbers
-            word = ws.cell(r, col).value
-            pos = ws.cell(r + 1, col).value
-            level = ws.cell(r + 2, col).value
-            entry = (word, pos, level)
-            if word and pos and level:
-                tagged[entry] += 1
-    tagged = [(a[0], a[1], a[2], f) for a, f in tagged.items()]
+    """
+    :return: list of tuple(word, POS, level, freq) of all the tagged words of in_file
+    """
+    tagged = count_tagged(in_file)
+    return [(a[0], a[1], a[2], f) for a, f in tagged.items()]
+
+
+def count_tagged(in_file):
+    """
+    Streams a tagging sheet in read-only mode, rows being read in blocks of four: words, POS, levels, empty.
+
+    :return: Counter of tuple(word, POS, level)
+    """
+    wb = load_workbook(in_file, read_only=True)
+    try:
+        tagged = Counter()
+        rows = wb.active.iter_rows(min_row=1, values_only=True)
+        while True:
+            block = list(islice(rows, 4))
+            if len(block) < 3:
+                break
+            words, pos, levels = block[:3]
+            for entry in zip(words, pos, levels):
+                if all(entry):
+                    tagged[entry] += 1
+    finally:
+        wb.close()
     return tagged
 
 
-def generate_to_tag(in_file, onto, pos_list, levels, l_colors, out_file=None, fields=dict):
+def similar_comment(similar):
+    # the lemmas close to a new word are offered in a comment of its cell
+    return Comment("similar: " + " ".join(similar[:5]), "leavedonto")
+
+
+@timed("tag.generate_to_tag")
+def generate_to_tag(in_file, onto, pos_list, levels, l_colors, out_file=None, fields=dict, cache=None, progress=None,
+                    similar=0):
     # first load all the ontos you need in OntoManager, then run
+    # cache: LookupCache shared between calls, each distinct word is only looked up once in the onto
+    # similar: max edit distance of the known lemmas offered for new words, 0 to offer none
+    if cache is None:
+        cache = LookupCache(onto)
+    progress = progress if progress else Progress()
+
     font = "Jomolhari"
     ft_words = Font(font, size=17, color="000c1d91")
     ft_pos = Font(font, size=13, color="004e4f54")
@@ -58,8 +108,7 @@ def generate_to_tag(in_file, onto, pos_list, levels, l_colors, out_file=None, fi
     wb.remove(wb.get_sheet_by_name("Sheet"))
 
     # read input file into rows
-    lines = in_file.read_text().lstrip("\ufeff").split("\n")
-    rows = rows_from_lines(lines)
+    rows = iter_rows(iter_lines(in_file), "sentence")
 
     # prepare data validation for POS and levels
     dv = DataVal(wb)
@@ -70,7 +119,10 @@ def generate_to_tag(in_file, onto, pos_list, levels, l_colors, out_file=None, fi
     sheet_name = in_file.stem.split("_")[0]
     ws = wb.create_sheet(title=sheet_name)
     ws.protection.sheet = True
+    pos_cells, level_cells = [], []
+    progress.start(f"tag {in_file.name}")
     for n, r in enumerate(rows):
+        progress.update(entries=len(r))
         row = n * 4 + 1
         pos_row = row + 1
         level_row = pos_row + 1
@@ -78,15 +130,18 @@ def generate_to_tag(in_file, onto, pos_list, levels, l_colors, out_file=None, fi
             col = m + 1
 
             # check if word exists in onto
-            found = onto.find_word(el)
-            found_pos = found[0][0][0] if found else None
-            entries = found[0][1] if found else None
+            found = cache.lookup(el)
+            found_pos, found_level = found if found else (None, None)
 
             # add word to spreadsheet
             word_cell = ws.cell(row=row, column=col)
             word_cell.value = el
             word_cell.font = ft_words
             word_cell.alignment = alignmnt
+            if not found and similar:
+                candidates = cache.similar(el, similar)
+                if candidates:
+                    word_cell.comment = similar_comment(candidates)
 
             # add POS
             pos_cell = ws.cell(row=pos_row, column=col)
@@ -94,24 +149,18 @@ def generate_to_tag(in_file, onto, pos_list, levels, l_colors, out_file=None, fi
             pos_cell.value = found_pos if found_pos else ""
             pos_cell.font = ft_pos
             pos_cell.alignment = alignmnt
-            dv.add_val_to_cell(
-                val_name="POS", sheet_name=sheet_name, row=pos_row, col=col
-            )
-            if not entries:
+            pos_cells.append((pos_row, col))
+            if not found:
                 pos_cell.fill = new_bgcolor
 
             # add level
             level_cell = ws.cell(row=level_row, column=col)
             level_cell.protection = Protection(locked=False)
-            level_cell.value = (
-                onto.get_field_value(entries[0], "level") if entries else fields["level"]
-            )
+            level_cell.value = found_level if found else fields["level"]
             level_cell.font = ft_level
             level_cell.alignment = alignmnt
-            dv.add_val_to_cell(
-                val_name="level", sheet_name=sheet_name, row=level_row, col=col
-            )
-            if not entries:
+            level_cells.append((level_row, col))
+            if not found:
                 level_cell.fill = new_bgcolor
 
         # set row height for each group of "word, POS and level"
@@ -122,7 +171,10 @@ def generate_to_tag(in_file, onto, pos_list, levels, l_colors, out_file=None, fi
             level_row + 1
         ].height = 30  # size of empty row between two lines
 
+    dv.add_val_to_cells("POS", sheet_name, pos_cells)
+    dv.add_val_to_cells("level", sheet_name, level_cells)
     resize_sheet(ws, mode="width")
+    progress.finish()
 
     if not out_file:
         out_file = in_file.parent / (in_file.stem + "_totag.xlsx")
@@ -130,13 +182,56 @@ def generate_to_tag(in_file, onto, pos_list, levels, l_colors, out_file=None, fi
     wb.save(out_file)
 
 
-def generate_to_tag_chunks(chunks, config, onto, line_mode, pos_list, levels, l_colors, out_file, fields=dict):
+@timed("tag.chunk")
+def generate_to_tag_chunks(chunks, manifest, onto, line_mode, levels, fields=dict, cache=None, similar=0):
+    """
+    Tags the first pending chunk and writes it as a part file. The cost of a chunk does not depend
+    on the number of chunks already processed: the tagging sheet is built once by assemble_chunks().
+
+    :param chunks: iterable of tuple(<chunk number>, <lines>)
+    :param manifest: ChunkManifest, updated with the processed chunk
+    """
+    if cache is None:
+        cache = LookupCache(onto)
+
+    for c_count, chunk in chunks:
+        if c_count not in manifest.pending:
+            continue
+
+        # every word is stored with its prefilled POS and level, whether it is new and the similar known lemmas
+        rows = []
+        for r in iter_rows(chunk, line_mode):
+            row = []
+            for el in r:
+                # check if word exists in onto
+                found = cache.lookup(el)
+                if found:
+                    pos, level = found
+                elif fields['level'] in levels:
+                    pos, level = "", fields['level']
+                else:
+                    pos, level = "", '???'
+                candidates = cache.similar(el, similar) if not found and similar else []
+                row.append([el, pos if pos else "", level, not found, candidates])
+            rows.append(row)
+
+        manifest.write_part(c_count, rows)
+        # ensures only one chunk is processed at a time
+        break
+
+    return manifest
+
+
+@timed("tag.assemble_chunks")
+def assemble_chunks(manifest, pos_list, levels, out_file):
+    """
+    Builds the tagging sheet from all the part files of the manifest, in a single pass
+    """
     # define the unit used to calculate the line number in the segmented file.
     # if mode == 'chunk', it is assumed that the format is 1word/line
     # else it is assumed that the format is 1sentence/line
-    unit = 12 * 4 if line_mode == 'chunk' else 4
+    unit = 12 * 4 if manifest.content["line_mode"] == 'chunk' else 4
 
-    # first load all the ontos you need in OntoManager, then run
     font = "Jomolhari"
     ft_words = Font(font, size=13, color="004e4f54")
     ft_pos = Font(font, size=17, color="000c1d91")
@@ -144,11 +239,8 @@ def generate_to_tag_chunks(chunks, config, onto, line_mode, pos_list, levels, l_
     new_bgcolor = PatternFill("solid", fgColor="0090f0a9")
     alignmnt = Alignment(horizontal="left", vertical="center")
 
-    if out_file.is_file():
-        wb = load_workbook(out_file)
-    else:
-        wb = Workbook()
-        wb.remove(wb.get_sheet_by_name("Sheet"))
+    wb = Workbook()
+    wb.remove(wb["Sheet"])
 
     # prepare data validation for POS and levels
     dv = DataVal(wb)
@@ -157,115 +249,73 @@ def generate_to_tag_chunks(chunks, config, onto, line_mode, pos_list, levels, l_
 
     # create sheet
     sheet_name = out_file.stem.split("_")[0]
-    if sheet_name not in wb.sheetnames:
-        ws = wb.create_sheet(title=sheet_name)
-    else:
-        ws = wb[sheet_name]
+    ws = wb.create_sheet(title=sheet_name)
     ws.protection.sheet = True
 
-    # process chunks
-    has_processed = False  # ensures only one chunk is processed at a time
-    for c_count, chunk in chunks.items():
-        has_added_chunk_num = False
-        if config[c_count] == 'todo' and not has_processed:
-            has_processed = True
-            config[c_count] = 'done'
-
-            # read input file into rows
-            rows = rows_from_lines(chunk, line_mode)
-            row_start = c_count * 4 * 4
-            if not has_added_chunk_num and c_count > 0:
-                count_cell = ws.cell(row=row_start, column=1)
-                count_cell.value = f'chunk {c_count}'
-                count_cell.alignment = Alignment(vertical='top')
-                line_cell = ws.cell(row=row_start, column=2)
-                line_cell.value = f'line {(c_count * unit) + 1}'
-                line_cell.alignment = Alignment(vertical='top')
-                has_added_chunk_num = True
-
-            for n, r in enumerate(rows):
-                row = row_start + n * 4 + 1
-                pos_row = row + 1
-                level_row = pos_row + 1
-                for m, el in enumerate(r):
-                    col = m + 1
-
-                    # check if word exists in onto
-                    found = onto.find_word(el)
-                    found_pos = found[0][0][0] if found else None
-                    entries = found[0][1] if found else None
-
-                    # add word to spreadsheet
-                    word_cell = ws.cell(row=row, column=col)
-                    word_cell.value = el
-                    word_cell.font = ft_words
-                    word_cell.alignment = alignmnt
-
-                    # add POS
-                    pos_cell = ws.cell(row=pos_row, column=col)
-                    pos_cell.protection = Protection(locked=False)
-                    pos_cell.value = found_pos if found_pos else ""
-                    pos_cell.font = ft_pos
-                    pos_cell.alignment = alignmnt
-                    dv.add_val_to_cell(
-                        val_name="POS", sheet_name=sheet_name, row=pos_row, col=col
-                    )
-                    if not entries:
-                        pos_cell.fill = new_bgcolor
-
-                    # add level
-                    level_cell = ws.cell(row=level_row, column=col)
-                    level_cell.protection = Protection(locked=False)
-                    if entries:
-                        level = onto.get_field_value(entries[0], "level")
-                    elif fields['level'] in levels:
-                        level = fields['level']
-                    else:
-                        level = '???'
-                    level_cell.value = level
-                    level_cell.font = ft_level
-                    level_cell.alignment = alignmnt
-                    dv.add_val_to_cell(
-                        val_name="level", sheet_name=sheet_name, row=level_row, col=col
-                    )
-                    if not entries:
-                        level_cell.fill = new_bgcolor
-
-                # set row height for each group of "word, POS and level"
-                ws.row_dimensions[row].height = 20
-                ws.row_dimensions[pos_row].height = 30
-                ws.row_dimensions[level_row].height = 15
-                ws.row_dimensions[
-                    level_row + 1
-                ].height = 30  # size of empty row between two lines
-
+    pos_cells, level_cells = [], []
+    for part_file in manifest.parts():
+        part = json.loads(part_file.read_text(encoding="utf-8"))
+        c_count = part["chunk"]
+
+        row_start = c_count * 4 * 4
+        if c_count > 0:
+            count_cell = ws.cell(row=row_start, column=1)
+            count_cell.value = f'chunk {c_count}'
+            count_cell.alignment = Alignment(vertical='top')
+            line_cell = ws.cell(row=row_start, column=2)
+            line_cell.value = f'line {(c_count * unit) + 1}'
+            line_cell.alignment = Alignment(vertical='top')
+
+        for n, r in enumerate(part["rows"]):
+            row = row_start + n * 4 + 1
+            pos_row = row + 1
+            level_row = pos_row + 1
+            # the part files of older versions have no similar lemmas
+            for m, (el, pos, level, is_new, *similar) in enumerate(r):
+                col = m + 1
+
+                # add word to spreadsheet
+                word_cell = ws.cell(row=row, column=col)
+                word_cell.value = el
+                word_cell.font = ft_words
+                word_cell.alignment = alignmnt
+                if similar and similar[0]:
+                    word_cell.comment = similar_comment(similar[0])
+
+                # add POS
+                pos_cell = ws.cell(row=pos_row, column=col)
+                pos_cell.protection = Protection(locked=False)
+                pos_cell.value = pos
+                pos_cell.font = ft_pos
+                pos_cell.alignment = alignmnt
+                pos_cells.append((pos_row, col))
+                if is_new:
+                    pos_cell.fill = new_bgcolor
+
+                # add level
+                level_cell = ws.cell(row=level_row, column=col)
+                level_cell.protection = Protection(locked=False)
+                level_cell.value = level
+                level_cell.font = ft_level
+                level_cell.alignment = alignmnt
+                level_cells.append((level_row, col))
+                if is_new:
+                    level_cell.fill = new_bgcolor
+
+            # set row height for each group of "word, POS and level"
+            ws.row_dimensions[row].height = 20
+            ws.row_dimensions[pos_row].height = 30
+            ws.row_dimensions[level_row].height = 15
+            ws.row_dimensions[
+                level_row + 1
+            ].height = 30  # size of empty row between two lines
+
+    dv.add_val_to_cells("POS", sheet_name, pos_cells)
+    dv.add_val_to_cells("level", sheet_name, level_cells)
     resize_sheet(ws, mode="width")
 
     wb.save(out_file)
-    return config
 
 
 def rows_from_lines(lines, line_mode):
-    if line_mode == 'sentence':
-        return lines
-
-    elif line_mode == 'chunk':
-        row_size = 12
-
-        words = [l for line in lines for l in line]
-
-        rows = []
-        cur_row = []
-        while words:
-            cur_row.append(words.pop(0))
-
-            if len(cur_row) == row_size:
-                rows.append(cur_row)
-                cur_row = []
-        if cur_row:
-            rows.append(cur_row)
-
-        return rows
-
-    else:
-        raise SyntaxError('line_mode is either "sentence" or "chunk".')
+    return list(iter_rows(lines, line_mode))
@@ -3,6 +3,14 @@
 # inspired from https://gist.github.com/nickstanisha/733c134a0171a00f66d4
 # and           https://github.com/eroux/tibetan-phonetics-py
 
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from .instrument import count
+from .origins import format_entry
+from .query import FieldIndex, RankIndex, compile_where, run_query
+
 
 class Node:
     def __init__(self):
@@ -10,6 +18,22 @@ class Node:
         self.data = []
         self.leaf = False
         self.children = dict()
+        # aggregates of the subtree rooted at this node, itself included
+        self.n_entries = 0
+        self.n_leaves = 0
+        # version of the trie the node belongs to, see OntTrie
+        self.owner = None
+
+    def copy(self, owner):
+        node = Node()
+        node.path = self.path
+        node.data = list(self.data)
+        node.leaf = self.leaf
+        node.children = dict(self.children)
+        node.n_entries = self.n_entries
+        node.n_leaves = self.n_leaves
+        node.owner = owner
+        return node
 
     def add_child(self, key):
         if not isinstance(key, Node):
@@ -28,54 +52,492 @@ class Node:
 
 
 class OntTrie:
-    def __init__(self):
+    """
+    Writes copy the nodes they modify unless the nodes belong to the current version of the trie (path copying).
+    As long as no version is published, all the nodes belong to the current version and are modified in place.
+
+    In concurrent mode, every write is a transaction: the modified nodes are copied into a draft version,
+    which is published at the end of the transaction by replacing self.head in a single assignment.
+    The indexes are copied the same way, and published with the head.
+    Readers never wait for a lock: they walk the version that was published when they started.
+    The entries are shared between versions: replace them (replace_entry(), map_leaves()), don't modify them.
+    """
+    def __init__(self, concurrent=False):
         self.legend = []
+        self.concurrent = concurrent
+        self._version = object()  # nodes owned by this token can be modified in place
         self.head = Node()
+        self.head.owner = self._version
+        # incremented by every write, for the indexes built from the trie to know when they are stale
+        self.generation = 0
+        # {<name>: <index>}: secondary indexes, notified of the entries added and removed by every write.
+        # in concurrent mode, the published indexes are not modified: the dict is replaced
+        self.indexes = {}
+
+        # draft version of the writing thread and its indexes, during a transaction
+        self._draft = None
+        self._draft_indexes = {}
+        self._writer = None
+        self._lock = threading.RLock()
+        # tuple(<head>, {<name>: <index>}): indexes rebuilt by readers while a transaction ran, for that head
+        self._aside = (None, {})
 
     def __getitem__(self, key):
-        return self.head.children[key]
+        return self._read_root().children[key]
+
+    def __getstate__(self):
+        # copies and pickles hold the published version, without the state of a running transaction
+        state = self.__dict__.copy()
+        for attr in ["_draft", "_draft_indexes", "_writer", "_lock", "_aside"]:
+            del state[attr]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._draft = None
+        self._draft_indexes = {}
+        self._writer = None
+        self._lock = threading.RLock()
+        self._aside = (None, {})
+        # the indexes refer to the entries by their id
+        self.__reset_indexes()
+
+    def _read_root(self):
+        # the writing thread reads its own draft, all the other threads read the published version
+        draft = self._draft
+        if draft is not None and self._writer == threading.get_ident():
+            return draft
+        return self.head
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups writes into a single version, published atomically when the block exits without error.
+        If an exception is raised, the draft is discarded and the published version is left as it was.
+        Only isolates the writes in concurrent mode, and nested transactions are part of the outer one.
+        """
+        if not self.concurrent or self._writer == threading.get_ident():
+            yield self
+            return
+
+        with self._lock:  # writers are serialized
+            self._version = object()  # the published nodes are read-only from now on
+            self._draft = self.head
+            self._writer = threading.get_ident()
+            try:
+                yield self
+                if self._draft_indexes:
+                    drafts = {name: index for name, index in self._draft_indexes.items() if name in self.indexes}
+                    self.indexes = {**self.indexes, **drafts}
+                self.head = self._draft
+            finally:
+                # the draft indexes of a failed transaction are discarded with the draft
+                self._draft = None
+                self._draft_indexes = {}
+                self._writer = None
 
     def add(self, o_path, data=None):
-        # adding the word
-        current_node = self.head
-        path_finished = True
-
-        i = 0
-        for i in range(len(o_path)):
-            if o_path[i] in current_node.children:
-                current_node = current_node.children[o_path[i]]
-            else:
-                path_finished = False
-                break
+        if data and not isinstance(data, list):
+            raise ValueError("data should be a list.")
+
+        with self.transaction():
+            # adding the word
+            nodes = self.__walk_writable(o_path, create=True)
+            current_node = nodes[-1]
+            self.__set_leaf(nodes)
+
+            # adding data to the node
+            if data:
+                current_node.data.append(data)
+                current_node.path = o_path
+                self.__update_counts(nodes, 1)
+                self.__notify(o_path, added=[data])
+
+    def add_entries(self, o_path, entries):
+        """
+        Bulk version of add(): walks o_path once and appends all the entries to the leaf
+        """
+        with self.transaction():
+            nodes = self.__walk_writable(o_path, create=True)
+            current_node = nodes[-1]
+            self.__set_leaf(nodes)
+            if entries:
+                current_node.data.extend(entries)
+                current_node.path = o_path
+                self.__update_counts(nodes, len(entries))
+                self.__notify(o_path, added=entries)
 
-        if not path_finished:
-            while i < len(o_path):
-                current_node.add_child(o_path[i])
-                current_node = current_node.children[o_path[i]]
-                i += 1
+    def remove_entry(self, path, entry):
+        count("remove_entry")
+        with self.transaction():
+            n = self.__find_in_leaf(path, entry)
+            if n is None:
+                return
+
+            nodes = self.__walk_writable(path)
+            current_node = nodes[-1]
+            removed = current_node.data[n]
+            current_node.data = current_node.data[:n] + current_node.data[n+1:]
+            self.__update_counts(nodes, -1)
+            self.__notify(path, removed=[removed])
+
+    def replace_entry(self, path, entry, new_entry):
+        """
+        Replaces the first entry of the leaf at path equal to entry. Returns False if there is no such entry.
+        """
+        with self.transaction():
+            n = self.__find_in_leaf(path, entry)
+            if n is None:
+                return False
 
-        current_node.leaf = True
+            nodes = self.__walk_writable(path)
+            removed = nodes[-1].data[n]
+            nodes[-1].data[n] = new_entry
+            self.__notify(path, added=[new_entry], removed=[removed])
+            return True
 
-        # adding data to the node
-        if data:
-            if not isinstance(data, list):
-                raise ValueError("data should be a list.")
+    def map_leaves(self, func):
+        """
+        Replaces the entries of every leaf by func(<entries>), func returning a new list. Counters are updated,
+        and the indexes are notified of the entries that func did not keep as they were.
+        """
+        with self.transaction():
+            self.generation += 1
+            root = self.__own(self.__write_root(), None, None)
+            stack, order = [(root, [])], []
+            while stack:
+                node, path = stack.pop()
+                order.append(node)
+                if node.leaf:
+                    old = node.data
+                    node.data = func(old)
+                    if self.indexes:
+                        self.__notify_changes(path, old, node.data)
+                for key, child in list(node.children.items()):
+                    stack.append((self.__own(child, node, key), path + [key]))
+            self.__recount(order)
+
+    def create_index(self, field):
+        """
+        Secondary index of a legend field for query(), built on the first query using it and then kept current
+        """
+        if field not in self.legend:
+            raise IndexError(f"{field} not contained in legend:\n{self.legend}")
+        with self._lock:
+            if field not in self.indexes:
+                self.indexes = {**self.indexes, field: FieldIndex(field)}
 
-            current_node.data.append(data)
-            current_node.path = o_path
+    def drop_index(self, field):
+        with self._lock:
+            self.indexes = {name: index for name, index in self.indexes.items() if name != field}
 
-    def remove_entry(self, path, entry):
-        queue = [self.head]
+    def get_index(self, name):
+        """
+        :return: the index of the version read by this thread, up to date, or None if there is none
+        """
+        if self._draft is not None and self._writer == threading.get_ident():
+            index = self._draft_indexes.get(name) or self.indexes.get(name)
+            if index is not None and index.stale:
+                index = self._draft_indexes[name] = self.__built(index)
+            return index
+
+        index = self.indexes.get(name)
+        if index is None or not index.stale:
+            return index
+        head, aside = self._aside
+        if head is self.head and name in aside:
+            return aside[name]
+
+        head = self.head
+        fresh = self.__built(index)
+        if not self._lock.acquire(blocking=False):
+            # a transaction runs: the index is kept aside until the next version is published
+            aside = aside if self._aside[0] is head else {}
+            self._aside = (head, {**aside, name: fresh})
+            return fresh
+        try:
+            if self.head is head and self.indexes.get(name) is index:
+                self.indexes = {**self.indexes, name: fresh}
+        finally:
+            self._lock.release()
+        return fresh
+
+    def __built(self, index):
+        # new index of the same field, built from the version read by this thread
+        fresh = type(index)(index.field)
+        fresh.rebuild(self)
+        return fresh
+
+    def query(self, where, prefix=None):
+        """
+        Entries under prefix whose fields satisfy the conditions of where, see leavedonto.query
+
+        :return: list of tuple(path, entries)
+        """
+        return run_query(self, where, prefix=prefix)
+
+    def top_entries(self, k=10, prefix=None, where=None, field="freq"):
+        """
+        The k entries with the highest numeric field under prefix, satisfying where (see query()).
+        The ranking of the field is indexed on the first call, then kept current.
+
+        :return: list of tuple(path, entry), the highest first
+        """
+        matches, _ = compile_where(self.legend, where)
+        index = self.__rank_index(field)
+        return index.top(k, prefix=self.__category(prefix), matches=matches if where else None)
+
+    def entries_above(self, threshold, prefix=None, where=None, field="freq"):
+        """
+        Entries under prefix whose numeric field is at least threshold, see top_entries()
+        """
+        matches, _ = compile_where(self.legend, where)
+        index = self.__rank_index(field)
+        return index.above(threshold, prefix=self.__category(prefix), matches=matches if where else None)
+
+    def __rank_index(self, field):
+        if field not in self.legend:
+            raise IndexError(f"{field} not contained in legend:\n{self.legend}")
+        name = ("rank", field)
+        if name not in self.indexes and self._lock.acquire(blocking=False):
+            try:
+                if name not in self.indexes:
+                    self.indexes = {**self.indexes, name: RankIndex(field)}
+            finally:
+                self._lock.release()
+        if name not in self.indexes:
+            # registered once the transaction of another thread is over
+            return self.__built(RankIndex(field))
+        return self.get_index(name)
+
+    @staticmethod
+    def __category(prefix):
+        return [prefix] if isinstance(prefix, str) else prefix if prefix else []
+
+    def __notify_changes(self, path, old, new):
+        old_ids, new_ids = {id(e) for e in old}, {id(e) for e in new}
+        added = [e for e in new if id(e) not in old_ids]
+        removed = [e for e in old if id(e) not in new_ids]
+        if added or removed:
+            self.__notify(path, added=added, removed=removed)
+
+    def __notify(self, path, added=(), removed=()):
+        for index in self.__writable_indexes().values():
+            if removed:
+                index.remove(path, removed)
+            if added:
+                index.add(path, added)
+
+    def __writable_indexes(self):
+        # in a transaction, the writer modifies copies of the published indexes
+        if self._draft is None:
+            return self.indexes
+        for name, index in self.indexes.items():
+            if name not in self._draft_indexes:
+                self._draft_indexes[name] = index.copy()
+        return self._draft_indexes
+
+    def __reset_indexes(self):
+        if self._draft is None:
+            for index in self.indexes.values():
+                index.reset()
+        else:
+            self._draft_indexes = {name: type(index)(index.field) for name, index in self.indexes.items()}
+
+    def __find_in_leaf(self, path, entry):
+        # index of entry in the leaf at path of the version being written, without copying anything
+        nodes = self.__walk(path, root=self.__write_root())
+        if not nodes or not nodes[-1].leaf:
+            return None
+        for n, e in enumerate(nodes[-1].data):
+            if e is entry or e == entry:
+                return n
+        return None
+
+    def __walk(self, o_path, root=None):
+        """
+        :return: list of the nodes from the head to the end of o_path, None if o_path is not in the trie
+        """
+        current_node = root if root else self._read_root()
+        nodes = [current_node]
+        for p in o_path:
+            if p not in current_node.children:
+                return None
+            current_node = current_node.children[p]
+            nodes.append(current_node)
+        return nodes
+
+    def __walk_writable(self, o_path, create=False):
+        """
+        Same as __walk(), the nodes being copied in the version being written if they are not part of it yet
+        """
+        if not create and self.__walk(o_path, root=self.__write_root()) is None:
+            return None
+
+        self.generation += 1
+        current_node = self.__own(self.__write_root(), None, None)
+        nodes = [current_node]
+        for p in o_path:
+            if p in current_node.children:
+                child = self.__own(current_node.children[p], current_node, p)
+            else:
+                child = Node()
+                child.owner = self._version
+                current_node.children[p] = child
+            nodes.append(child)
+            current_node = child
+        return nodes
+
+    def __write_root(self):
+        return self._draft if self._draft is not None else self.head
+
+    def __set_write_root(self, node):
+        if self._draft is not None:
+            self._draft = node
+        else:
+            self.head = node
+
+    def __own(self, node, parent, key):
+        if node.owner is self._version:
+            return node
+
+        copy = node.copy(self._version)
+        if parent is not None:
+            parent.children[key] = copy
+        else:
+            self.__set_write_root(copy)
+        return copy
+
+    def snapshot(self):
+        """
+        Copy of the current version in O(1): all the nodes are shared, and the first write to a shared node,
+        in the trie or in the snapshot, only copies that node and its ancestors.
+        The snapshot is an OntTrie: it can be queried, exported, modified for what-if merges or restored.
+        """
+        with self._lock:
+            self._version = object()  # the nodes are shared from now on
+            snapshot = OntTrie()
+            snapshot.legend = list(self.legend)
+            snapshot.head = self.__write_root()
+            return snapshot
+
+    def restore(self, snapshot):
+        """
+        Makes a snapshot the current version of the trie, in O(1). The snapshot stays usable.
+        """
+        with self.transaction():
+            with snapshot._lock:
+                snapshot._version = object()
+                root = snapshot.__write_root()
+            self._version = object()
+            self.generation += 1
+            self.__set_write_root(root)
+            self.legend = list(snapshot.legend)
+            self.__reset_indexes()
+
+    def diff(self, other):
+        """
+        Entries added and removed from this trie to other, typically between two snapshots.
+        Subtrees shared by both tries are skipped: the cost depends on the changes, not on the size of the tries.
+
+        :return: added, removed: lists of tuple(path, entry)
+        """
+        added, removed = [], []
+        stack = [(self._read_root(), other._read_root())]
+        while stack:
+            old, new = stack.pop()
+            if old is new:
+                continue
+            if old is None:
+                added.extend(self.__subtree_entries(new))
+                continue
+            if new is None:
+                removed.extend(self.__subtree_entries(old))
+                continue
+
+            if old.data != new.data:
+                added.extend((new.path, e) for e in self.__missing(new.data, old.data))
+                removed.extend((old.path, e) for e in self.__missing(old.data, new.data))
+
+            keys = list(new.children) + [key for key in old.children if key not in new.children]
+            stack.extend((old.children.get(key), new.children.get(key)) for key in reversed(keys))
+        return added, removed
+
+    @staticmethod
+    def __missing(entries, others):
+        # entries not in others, duplicates included
+        extra = Counter(tuple(format_entry(e)) for e in entries) - Counter(tuple(format_entry(e)) for e in others)
+        missing = []
+        for entry in entries:
+            t = tuple(format_entry(entry))
+            if extra[t] > 0:
+                extra[t] -= 1
+                missing.append(entry)
+        return missing
+
+    @staticmethod
+    def __subtree_entries(node):
+        entries = []
+        queue = deque([node])
         while queue:
             current_node = queue.pop()
-            if current_node.leaf and current_node.path == path:
-                # remove entry ##
-                for n, e in enumerate(current_node.data):
-                    if e == entry:
-                        current_node.data = current_node.data[:n] + current_node.data[n+1:]
-                        return
-                #################
-            queue = [node for key, node in current_node.children.items()] + queue
+            if current_node.leaf:
+                entries.extend((current_node.path, e) for e in current_node.data)
+            queue.extendleft(reversed(current_node.children.values()))
+        return entries
+
+    @staticmethod
+    def __set_leaf(nodes):
+        if not nodes[-1].leaf:
+            nodes[-1].leaf = True
+            for node in nodes:
+                node.n_leaves += 1
+
+    @staticmethod
+    def __update_counts(nodes, n):
+        for node in nodes:
+            node.n_entries += n
+
+    def recount(self):
+        """
+        Recomputes the counters of all the nodes, to be called after modifying the data of nodes directly
+        """
+        stack, order = [self.__write_root()], []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children.values())
+        self.__recount(order)
+
+    @staticmethod
+    def __recount(order):
+        # children are counted before their parents
+        for node in reversed(order):
+            node.n_entries = len(node.data) if node.leaf else 0
+            node.n_leaves = 1 if node.leaf else 0
+            for child in node.children.values():
+                node.n_entries += child.n_entries
+                node.n_leaves += child.n_leaves
+
+    def count_entries(self, path=None):
+        """
+        Number of entries under path, in O(len(path)). All the entries of the trie if path is None
+        """
+        nodes = self.__walk(path if path else [])
+        return nodes[-1].n_entries if nodes else 0
+
+    def count_leaves(self, path=None):
+        nodes = self.__walk(path if path else [])
+        return nodes[-1].n_leaves if nodes else 0
+
+    def category_totals(self, path=None):
+        """
+        {<category>: <number of entries>} of the categories directly under path, the top-level ones by default
+        """
+        nodes = self.__walk(path if path else [])
+        if not nodes:
+            return {}
+        return {key: node.n_entries for key, node in nodes[-1].children.items()}
 
     def find_entries(self, prefix=None, lemma=None, mode="entries"):
         """
@@ -83,15 +545,16 @@ class OntTrie:
         In case prefix == None, all results are returned
         In case mode == entries, return full entries, elif mode == lemmas, return only lemmas
         """
+        count("find_entries")
         results = []
 
         # 1. Determine search scope by finding end-of-prefix node
         if not prefix:
-            top_node = self.head
+            top_node = self._read_root()
             queue = [node for key, node in top_node.children.items()]
         else:
             prefix = [prefix] if isinstance(prefix, str) else prefix
-            top_node = self.head
+            top_node = self._read_root()
             for p in prefix:
                 if p in top_node.children:
                     top_node = top_node.children[p]
@@ -141,10 +604,10 @@ class OntTrie:
 
         # 1. parse through to the end of path,
         if not path:
-            top_node = self.head
+            top_node = self._read_root()
             queue = [node for key, node in top_node.children.items()]
         else:
-            top_node = self.head
+            top_node = self._read_root()
             for p in path:
                 if p in top_node.children:
                     top_node = top_node.children[p]
@@ -178,7 +641,7 @@ class OntTrie:
             raise ValueError('"path" must be list of strings')
 
         # parse the path
-        current_node = self.head
+        current_node = self._read_root()
         exists = True
         for el in path:
             if el in current_node.children:
@@ -206,24 +669,40 @@ class OntTrie:
         if not path:
             raise ValueError('"path" must be a list of strings')
 
-        # parse word
-        current_node = self.head
-        for el in path:
-            if el in current_node.children:
-                current_node = current_node.children[el]
-            else:
+        with self.transaction():
+            # parse word
+            nodes = self.__walk(path, root=self.__write_root())
+
+            # not a complete word
+            if not nodes or not nodes[-1].leaf:
                 return False
 
-        # not a complete word
-        if not current_node.leaf:
-            return False
+            # adding data
+            nodes = self.__walk_writable(path)
+            nodes[-1].data.append(data)
+            self.__update_counts(nodes, 1)
+            self.__notify(path, added=[data])
+            return True
 
-        # adding data
-        current_node.data.append(data)
-        return True
+    def iter_leaves(self):
+        """
+        Yields tuple(path, entries) for every leaf, lazily and in the same order as find_entries()
+        """
+        queue = deque([self._read_root()])
+        while queue:
+            current_node = queue.pop()
+            if current_node.leaf:
+                yield current_node.path, current_node.data
+            queue.extendleft(reversed(current_node.children.values()))
+
+    def size(self):
+        """
+        Number of entries in the trie
+        """
+        return self._read_root().n_entries
 
     def export_all_entries(self):
-        queue = [self.head]
+        queue = [self._read_root()]
 
         entries = []
         while queue:
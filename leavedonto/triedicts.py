@@ -1,7 +1,11 @@
 from .trie import OntTrie
+from .origins import format_entry
+from .instrument import timed
+from .progress import Progress
 
 
-def trie_to_dicts(trie):
+@timed("trie_to_dicts")
+def trie_to_dicts(trie, progress=None):
     # very ugly hack using exec() to be able to populate the nested dicts from the lists of paths
     # the difficulty lies in growing "dicts['ont']" until "dicts['ont'][branch1][branch3][branch4]"
     # and, at every step, creating the nested dict if required
@@ -18,10 +22,13 @@ def trie_to_dicts(trie):
     #       }
     # }
     dicts = {"legend": trie.legend, "ont": {}}
+    progress = progress if progress else Progress()
 
     all_branches = trie.find_entries()
+    progress.start("export", total=len(all_branches))
     for branch in all_branches:
         path, entries = branch
+        entries = [format_entry(e) for e in entries]
         i = 0
         while i < len(path):
             part = 'dicts["ont"]' + "".join([f'["{p}"]' for p in path[:i]])
@@ -35,6 +42,8 @@ def trie_to_dicts(trie):
                 break
             i += 1
         exec('dicts["ont"]' + "".join([f'["{p}"]' for p in path]) + " = entries")
+        progress.update(entries=len(entries))
+    progress.finish()
 
     return dicts
 
@@ -0,0 +1,34 @@
+# coding: utf8
+from pathlib import Path
+
+from leavedonto import LeavedOnto
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def test_coverage(tmp_path):
+    text2 = tmp_path / "text2_segmented.txt"
+    text2.write_text("རྟ་ ཀཀ་ ། བྱ་\n", encoding="utf-8")
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+
+    report = onto.coverage([resources / "text1_segmented.txt", text2], top=2)
+
+    text1 = report["files"][str(resources / "text1_segmented.txt")]
+    assert (text1["tokens"], text1["covered_tokens"], text1["types"], text1["covered_types"]) == (7, 6, 4, 3)
+    assert report["files"][str(text2)]["token_coverage"] == 1 / 3
+    assert report["total"]["tokens"] == 10
+    assert report["total"]["types"] == 6
+    assert report["uncovered"] == [("བྱ་", 2), ("ཀཀ་", 1)]
+    assert report["categories"] == {"NOUN": 4, "VERB": 3}
+    assert report["levels"] == {"A0": 5, "A1": 2}
+
+
+def test_coverage_update_freq():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+    onto.coverage(resources / "text1_segmented.txt", update_freq="add")
+
+    entry = onto.find_word("ཁྱི་")[0][1][0]
+    assert onto.get_field_value(entry, "freq") == 6
+    onto.coverage(resources / "text1_segmented.txt", update_freq="replace")
+    entry = onto.find_word("ཁྱི་")[0][1][0]
+    assert onto.get_field_value(entry, "freq") == 3
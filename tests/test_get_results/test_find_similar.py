@@ -0,0 +1,20 @@
+# coding: utf8
+from pathlib import Path
+
+from leavedonto import LeavedOnto
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def test_find_similar():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+
+    assert onto.find_similar("ཁྱི") == [("ཁྱི་", 1)]  # missing tsek
+    assert onto.find_similar("ཁྱིས་") == [("ཁྱི་", 1)]
+    assert onto.find_similar("ཁྱིས་", max_distance=0) == []
+    assert onto.find_similar("ཁྱི", max_distance=0, granularity="syllable") == [("ཁྱི་", 0)]
+    assert onto.find_similar("རྟ་ཟ་", granularity="syllable") == [("ཟ་", 1), ("རྟ་", 1)]
+
+    # the index follows the modifications of the onto
+    onto.ont.add(["NOUN", "animals"], ["ཁྱིམ་", "NOUN", "A1", 1, ""])
+    assert onto.find_similar("ཁྱི", max_distance=2) == [("ཁྱི་", 1), ("ཁྱིམ་", 2)]
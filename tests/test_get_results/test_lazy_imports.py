@@ -0,0 +1,21 @@
+# coding: utf8
+import subprocess
+import sys
+from pathlib import Path
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def loaded_modules(statement):
+    code = f"import sys\n{statement}\nprint(*[m for m in ['openpyxl', 'tibetan_sort'] if m in sys.modules])"
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+
+
+def test_import_is_light():
+    assert loaded_modules("import leavedonto; from leavedonto import OntoManager") == []
+
+
+def test_yaml_lookup_without_openpyxl():
+    onto = resources / "test_onto_freq.yaml"
+    statement = f"from leavedonto import LeavedOnto; LeavedOnto({str(onto)!r}).find_word('ཁྱི་')"
+    assert loaded_modules(statement) == ["tibetan_sort"]
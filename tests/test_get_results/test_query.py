@@ -0,0 +1,62 @@
+# coding: utf8
+from pathlib import Path
+
+from leavedonto import LeavedOnto
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def lemmas(found):
+    return sorted(entry[0] for _, entries in found for entry in entries)
+
+
+def test_query():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+
+    assert lemmas(onto.query({"level": "A1"})) == ["ཟ་", "རྟ་"]
+    assert lemmas(onto.query({"level": "A1", "freq": (">", 5)})) == ["རྟ་"]
+    assert lemmas(onto.query({"freq": ("range", 4, 12)}, prefix=["NOUN"])) == ["དེབ་", "རྟ་"]
+    assert lemmas(onto.query({"origin": "text2", "POS": ("in", ["VERB", "ADJ"])})) == ["འགྲོ་"]
+    assert lemmas(onto.query({"word": ("prefix", "ཁ")})) == ["ཁྱི་"]
+    assert lemmas(onto.query({"freq": ("<=", 3)})) == ["ཁྱི་"]
+
+
+def test_indexes_follow_mutations():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+    scanned = LeavedOnto(resources / "test_onto_freq.yaml")
+    for field in ["level", "freq", "origin"]:
+        onto.ont.create_index(field)
+    queries = [{"level": "A1"}, {"freq": (">=", 5)}, {"origin": "text3"}, {"level": "A2", "freq": ("<", 10)}]
+
+    def check():
+        for where in queries:
+            assert lemmas(onto.query(where)) == lemmas(scanned.query(where))
+
+    check()
+    for o in [onto, scanned]:
+        o.ont.add(["NOUN", "animals"], ["བྱ་", "NOUN", "A2", 8, {"text3": 8}])
+        dog = o.find_word("ཁྱི་")[0][1][0]
+        o.ont.replace_entry(["NOUN", "animals"], dog, ["ཁྱི་", "NOUN", "A1", 30, {"text3": 30}])
+        o.ont.remove_entry(["VERB", "action"], o.find_word("ཟ་")[0][1][0])
+    check()
+    assert lemmas(onto.query({"origin": "text3"})) == ["ཁྱི་", "བྱ་"]
+
+    # updated incrementally, the cleanup included
+    index = onto.ont.get_index("origin")
+    assert len(index.buckets[(1, "text3")]) == 2
+    onto._cleanup()
+    assert not index.stale
+    check()
+
+
+def test_replace_field_value_updates_indexes():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+    onto.ont.create_index("level")
+    assert lemmas(onto.query({"level": "A1"})) == ["ཟ་", "རྟ་"]
+
+    horse = onto.find_word("རྟ་")[0][1][0]
+    new = onto.replace_field_value(["NOUN", "animals"], horse, "level", "C1", mode="replace")
+    assert horse[2] == "A1" and new[2] == "C1"
+    assert lemmas(onto.query({"level": "A1"})) == ["ཟ་"]
+    assert lemmas(onto.query({"level": "C1"})) == ["རྟ་"]
+    assert onto.replace_field_value(["NOUN", "animals"], horse, "level", "B1", mode="replace") is None
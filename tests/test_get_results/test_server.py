@@ -0,0 +1,69 @@
+# coding: utf8
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from leavedonto.server import OntoServer, OntoClient
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+@pytest.fixture
+def onto(tmp_path):
+    onto = tmp_path / "onto.yaml"
+    shutil.copy(resources / "test_onto_freq.yaml", onto)
+    return onto
+
+
+def test_queries(onto):
+    server = OntoServer(onto).start()
+    try:
+        with OntoClient(server.address) as client:
+            assert client.find_word("ཁྱི་") == [(["NOUN", "animals"], [["ཁྱི་", "NOUN", "A0", 3, "text1:3"]])]
+            assert client.find_words(["ཟ་", "ཀཀ་"]) == {
+                "ཟ་": [(["VERB", "action"], [["ཟ་", "VERB", "A1", 4, "text1:4"]])],
+                "ཀཀ་": [],
+            }
+            assert sorted(path for path, _ in client.find_entries(prefix="NOUN")) == [["NOUN", "animals"], ["NOUN", "objects"]]
+            assert client.legend == ["word", "POS", "level", "freq", "origin"]
+            with pytest.raises(ValueError):
+                client.request("unknown")
+            # the connection is still usable after an error
+            assert client.find_word("ཀཀ་") == []
+    finally:
+        server.stop()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Unix sockets")
+def test_reload_on_change(onto, tmp_path):
+    server = OntoServer(onto, socket_path=tmp_path / "onto.sock", check_interval=0.05).start()
+    try:
+        with OntoClient(server.address) as client:
+            assert client.find_word("བྱ་") == []
+
+            text = onto.read_text(encoding="utf-8").replace("ཟ་, VERB", "བྱ་, VERB")
+            onto.write_text(text, encoding="utf-8")
+            os.utime(onto, (time.time() + 10, time.time() + 10))
+            for _ in range(100):
+                if server.reloads:
+                    break
+                time.sleep(0.05)
+            assert client.find_word("བྱ་") == [(["VERB", "action"], [["བྱ་", "VERB", "A1", 4, "text1:4"]])]
+    finally:
+        server.stop()
+
+
+def test_broken_file_keeps_onto(onto):
+    server = OntoServer(onto)
+    onto.write_text("legend: [word, POS\nont: {", encoding="utf-8")
+    os.utime(onto, (time.time() + 10, time.time() + 10))
+    with pytest.raises(Exception):
+        server.reload()
+    assert server.answer({"op": "find_word", "word": "ཁྱི་"}) == [
+        (["NOUN", "animals"], [["ཁྱི་", "NOUN", "A0", 3, "text1:3"]])
+    ]
+    assert server.reloads == 0
+    server.server.server_close()
@@ -0,0 +1,51 @@
+# coding: utf8
+from pathlib import Path
+
+from leavedonto import LeavedOnto, OntoManager
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def ranked(found):
+    return [(entry[0], entry[3]) for _, entry in found]
+
+
+def test_top_words():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+
+    assert ranked(onto.top_words(2)) == [("འགྲོ་", 20), ("དེབ་", 12)]
+    assert ranked(onto.top_words(5, prefix=["NOUN", "animals"])) == [("རྟ་", 7), ("ཁྱི་", 3)]
+    assert ranked(onto.top_words(1, where={"level": "A1"})) == [("རྟ་", 7)]
+    assert ranked(onto.words_above(7)) == [("འགྲོ་", 20), ("དེབ་", 12), ("རྟ་", 7)]
+    assert ranked(onto.words_above(4, prefix="VERB")) == [("འགྲོ་", 20), ("ཟ་", 4)]
+    assert onto.top_words(3, prefix=["ADJ"]) == []
+
+
+def test_top_words_follow_merges():
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    assert ranked(om.onto1.top_words(3, prefix="NOUN")) == [("དེབ་", 12), ("རྟ་", 7), ("ཁྱི་", 3)]
+    index = om.onto1.ont.get_index(("rank", "freq"))
+
+    # the freqs of the shared entries are summed by the merge
+    om.merge_to_onto(resources / "test_onto_freq2.yaml")
+    assert not index.stale
+    assert ranked(om.onto1.top_words(3, prefix="NOUN")) == [("རྟ་", 14), ("དེབ་", 12), ("ཁྱི་", 8)]
+
+    everything = sorted(
+        ((entry[0], entry[3]) for _, entries in om.onto1.ont.find_entries() for entry in entries),
+        key=lambda x: (-x[1], x[0]),
+    )
+    assert ranked(om.onto1.top_words(100)) == everything
+
+
+def test_top_words_follow_field_edits():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+    assert ranked(onto.top_words(2, prefix="NOUN")) == [("དེབ་", 12), ("རྟ་", 7)]
+
+    dog = onto.find_word("ཁྱི་")[0][1][0]
+    dog = onto.replace_field_value(["NOUN", "animals"], dog, "freq", "100", mode="replace")
+    assert ranked(onto.top_words(2, prefix="NOUN")) == [("ཁྱི་", "100"), ("དེབ་", 12)]
+    assert ranked(onto.words_above(50)) == [("ཁྱི་", "100")]
+
+    onto.ont.remove_entry(["NOUN", "animals"], dog)
+    assert ranked(onto.top_words(2, prefix="NOUN")) == [("དེབ་", 12), ("རྟ་", 7)]
@@ -0,0 +1,114 @@
+# coding: utf8
+import threading
+
+import pytest
+
+from leavedonto import OntTrie
+
+
+def gen_trie():
+    trie = OntTrie(concurrent=True)
+    trie.add_entries(["NOUN", "animals"], [["ཁྱི་"], ["རྟ་"]])
+    trie.add_entries(["VERB"], [["འགྲོ་"]])
+    return trie
+
+
+def lemmas(trie):
+    return sorted(e[0] for _, entries in trie.find_entries() for e in entries)
+
+
+def test_readers_see_published_versions():
+    trie = gen_trie()
+    seen = {}
+    in_transaction, checked = threading.Event(), threading.Event()
+
+    def read():
+        in_transaction.wait()
+        seen["during"] = (lemmas(trie), trie.size())
+        checked.set()
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    with trie.transaction():
+        trie.add(["NOUN", "animals"], ["བྱ་"])
+        trie.remove_entry(["VERB"], ["འགྲོ་"])
+        assert lemmas(trie) == ["ཁྱི་", "བྱ་", "རྟ་"]  # the writer reads its own draft
+        in_transaction.set()
+        checked.wait()
+    reader.join()
+
+    assert seen["during"] == (["ཁྱི་", "འགྲོ་", "རྟ་"], 3)
+    assert lemmas(trie) == ["ཁྱི་", "བྱ་", "རྟ་"]
+    assert (trie.size(), trie.category_totals()) == (3, {"NOUN": 3, "VERB": 0})
+
+
+def test_failed_transaction_is_discarded():
+    trie = gen_trie()
+    found = trie.find_entries(prefix=["NOUN", "animals"])[0][1]
+    with pytest.raises(ValueError):
+        with trie.transaction():
+            trie.replace_entry(["NOUN", "animals"], ["ཁྱི་"], ["བྱ་"])
+            raise ValueError
+
+    assert lemmas(trie) == ["ཁྱི་", "འགྲོ་", "རྟ་"]
+    trie.map_leaves(lambda entries: entries[:1])
+    assert (lemmas(trie), trie.size()) == (["ཁྱི་", "འགྲོ་"], 2)
+    assert found == [["ཁྱི་"], ["རྟ་"]]  # results given to readers are never modified
+
+
+def gen_ranked_trie():
+    trie = OntTrie(concurrent=True)
+    trie.legend = ["word", "freq"]
+    trie.add_entries(["NOUN", "animals"], [["ཁྱི་", 3], ["རྟ་", 7]])
+    trie.add_entries(["VERB"], [["འགྲོ་", 20]])
+    trie.create_index("freq")
+    return trie
+
+
+def ranked(found):
+    return [entry[0] for _, entry in found]
+
+
+def queried(found):
+    return sorted(e[0] for _, entries in found for e in entries)
+
+
+def test_indexes_follow_published_versions():
+    trie = gen_ranked_trie()
+    assert ranked(trie.top_entries(2)) == ["འགྲོ་", "རྟ་"]
+    assert queried(trie.query({"freq": (">", 5)})) == ["འགྲོ་", "རྟ་"]
+    published = trie.get_index(("rank", "freq"))
+
+    # readers don't see the draft indexed by the writer: they keep ranking with the published index
+    seen = {}
+    in_transaction, checked = threading.Event(), threading.Event()
+
+    def read():
+        in_transaction.wait()
+        seen["top"] = ranked(trie.top_entries(2))
+        seen["query"] = queried(trie.query({"freq": (">", 5)}))
+        seen["index"] = trie.get_index(("rank", "freq"))
+        checked.set()
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    with pytest.raises(ValueError):
+        with trie.transaction():
+            trie.add(["NOUN", "animals"], ["བྱ་", 50])
+            assert ranked(trie.top_entries(2)) == ["བྱ་", "འགྲོ་"]
+            in_transaction.set()
+            checked.wait()
+            raise ValueError
+    reader.join()
+    assert seen == {"top": ["འགྲོ་", "རྟ་"], "query": ["འགྲོ་", "རྟ་"], "index": published}
+
+    # the entries of a discarded transaction are not left in the indexes
+    assert ranked(trie.top_entries(2)) == ["འགྲོ་", "རྟ་"]
+    assert queried(trie.query({"freq": (">", 5)})) == ["འགྲོ་", "རྟ་"]
+
+    # the indexes of a transaction are published with its version
+    with trie.transaction():
+        trie.add(["NOUN", "animals"], ["བྱ་", 50])
+    assert ranked(trie.top_entries(2)) == ["བྱ་", "འགྲོ་"]
+    assert queried(trie.query({"freq": (">", 5)})) == ["བྱ་", "འགྲོ་", "རྟ་"]
+    assert ranked(published.top(2)) == ["འགྲོ་", "རྟ་"]
@@ -0,0 +1,38 @@
+# coding: utf8
+from pathlib import Path
+
+from leavedonto import LeavedOnto, OntTrie
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def counts(trie):
+    return trie.size(), trie.count_leaves(), trie.category_totals(), trie.count_entries(["NOUN", "animals"])
+
+
+def test_counters_follow_mutations():
+    trie = OntTrie()
+    trie.add(["NOUN", "animals"], ["ཁྱི་"])
+    trie.add_entries(["NOUN", "animals"], [["རྟ་"], ["བྱ་"]])
+    trie.add(["VERB"])
+    trie.add_data(["VERB"], ["འགྲོ་"])
+    trie.add_entries(["NOUN", "objects"], [["དེབ་"]])
+    trie.remove_entry(["NOUN", "animals"], ["རྟ་"])
+    trie.remove_entry(["NOUN", "animals"], ["missing"])
+    trie.remove_entry(["ADJ"], ["missing"])
+
+    assert counts(trie) == (4, 3, {"NOUN": 3, "VERB": 1}, 2)
+    trie.recount()
+    assert counts(trie) == (4, 3, {"NOUN": 3, "VERB": 1}, 2)
+    assert trie.count_entries(["ADJ"]) == 0
+
+
+def test_tree_report():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+    onto.ont.add(["NOUN", "animals"], ["ཁྱི་", "NOUN", "A0", 3, "text1:3"])  # duplicate, removed by cleanup
+    onto._cleanup()
+
+    assert onto.export_tree_report() == (
+        [["VERB"], ["", "action: 2"], ["NOUN"], ["", "objects: 1"], ["", "animals: 2"]],
+        5,
+    )
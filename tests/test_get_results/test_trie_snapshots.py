@@ -0,0 +1,67 @@
+# coding: utf8
+from pathlib import Path
+
+from leavedonto import LeavedOnto, OntoManager
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def test_snapshot_restore_diff():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+    trie = onto.ont
+    before = trie.snapshot()
+    assert trie.diff(before) == ([], [])
+
+    dog = trie.find_entries(lemma="ཁྱི་")[0][1][0]
+    trie.remove_entry(["NOUN", "animals"], dog)
+    trie.add(["ADJ"], ["ཆེན་པོ་", "ADJ", "A0", 1, ""])
+    after = trie.snapshot()
+
+    # unchanged subtrees are shared
+    assert after.head.children["VERB"] is before.head.children["VERB"]
+    assert before.diff(after) == ([(["ADJ"], ["ཆེན་པོ་", "ADJ", "A0", 1, ""])], [(["NOUN", "animals"], dog)])
+    assert (before.size(), after.size()) == (5, 5)
+
+    trie.restore(before)
+    assert trie.is_in_onto(lemma="ཁྱི་")
+    assert not trie.has_category(["ADJ"])
+    assert trie.diff(before) == ([], [])
+
+    # writes to the restored trie leave the snapshot as it was
+    trie.add(["ADJ"], ["ཆུང་ངུ་", "ADJ", "A0", 1, ""])
+    assert not before.has_category(["ADJ"])
+
+
+def test_fork(tmp_path):
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+    fork = onto.fork()
+    om = OntoManager()
+    om.onto1 = fork
+    other = tmp_path / "text3_onto.yaml"
+    other.write_text(
+        "legend: [word, POS, level, freq, origin]\n"
+        "ont:\n"
+        "  NOUN:\n"
+        "    animals:\n"
+        "    - [བྱ་, NOUN, A0, 2, '']\n",
+        encoding="utf-8",
+    )
+    om.merge_to_onto(other)
+
+    assert fork.ont.is_in_onto(lemma="བྱ་")
+    assert not onto.ont.is_in_onto(lemma="བྱ་")
+    assert onto.ont.diff(fork.ont)[0][0][0] == ["NOUN", "animals"]
+
+
+def test_fork_replace_field_value():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+    fork = onto.fork()
+    horse = fork.find_word("རྟ་")[0][1][0]
+    assert horse is onto.find_word("རྟ་")[0][1][0]  # the entries are shared
+
+    horse = fork.replace_field_value(["NOUN", "animals"], horse, "level", "C1", mode="replace")
+    fork.replace_field_value(["NOUN", "animals"], horse, "origin", "text3:1")
+    assert fork.get_field_value(fork.find_word("རྟ་")[0][1][0], "level") == "C1"
+    assert "text3" in fork.get_field_value(fork.find_word("རྟ་")[0][1][0], "origin")
+    assert onto.get_field_value(onto.find_word("རྟ་")[0][1][0], "level") == "A1"
+    assert "text3" not in onto.get_field_value(onto.find_word("རྟ་")[0][1][0], "origin")
@@ -0,0 +1,53 @@
+# coding: utf8
+import asyncio
+import threading
+from pathlib import Path
+
+from leavedonto import LeavedOnto
+from leavedonto.aio import AsyncOnto
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def test_load_merge_export(tmp_path):
+    async def main():
+        async with AsyncOnto(max_concurrency=2) as aio:
+            onto1, onto2 = await asyncio.gather(
+                aio.load(resources / "test_onto_freq.yaml"), aio.load(resources / "test_onto_freq2.yaml")
+            )
+            merged = await aio.merge(onto1, onto2)
+            await aio.export(merged, tmp_path / "merged.yaml")
+            found = await aio.lookup_many(merged, ["ཁྱི་", "ཀཀ་"])
+            return onto1, merged, found
+
+    onto1, merged, found = asyncio.run(main())
+    assert onto1.ont.size() < merged.ont.size()  # onto1 is not modified by the merge
+    assert LeavedOnto(tmp_path / "merged.yaml").ont.size() == merged.ont.size()
+    assert found["ཁྱི་"] == merged.find_word("ཁྱི་") and found["ཀཀ་"] == []
+
+
+def test_cancelled_job_keeps_its_slot():
+    release = threading.Event()
+
+    def blocking_words():
+        release.wait()
+        yield "ཁྱི་"
+
+    async def main():
+        aio = AsyncOnto(max_concurrency=1)
+        onto = await aio.load(resources / "test_onto_freq.yaml")
+
+        blocked = asyncio.ensure_future(aio.lookup_many(onto, blocking_words()))
+        await asyncio.sleep(0.05)
+        blocked.cancel()
+        waiting = asyncio.ensure_future(aio.lookup_many(onto, ["ཁྱི་"]))
+        await asyncio.sleep(0.05)
+        # the cancelled lookup still runs: the next one waits for it
+        assert not waiting.done()
+        release.set()
+        found = await waiting
+        aio.close()
+        return blocked.cancelled(), found
+
+    cancelled, found = asyncio.run(main())
+    assert cancelled and found["ཁྱི་"]
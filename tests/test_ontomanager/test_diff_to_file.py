@@ -0,0 +1,39 @@
+# coding: utf8
+import json
+from pathlib import Path
+
+import yaml
+
+from leavedonto import OntoManager
+
+resources = Path(__file__).parent.parent / "resources"
+base = resources / "test_onto_freq.yaml"
+other = resources / "test_onto_freq2.yaml"
+
+
+def test_diff_to_file(tmp_path):
+    om = OntoManager(base)
+
+    counts = om.diff_to_file(other, tmp_path / "diff.jsonl")
+    assert counts == {"base_only": 3, "other_only": 3, "shared": 1}
+
+    records = [json.loads(line) for line in (tmp_path / "diff.jsonl").read_text().splitlines()]
+    shared = [r for r in records if r["diff"] == "shared"]
+    assert shared[0]["path"] == ["NOUN", "animals"]
+    assert shared[0]["base"][3] == 3 and shared[0]["other"][3] == 5
+
+    om.diff_to_file(other, tmp_path / "diff.yaml")
+    assert len(yaml.safe_load((tmp_path / "diff.yaml").read_text())) == 7
+
+    om.diff_to_file(other, tmp_path / "diff.xlsx")
+    assert (tmp_path / "diff.xlsx").is_file()
+
+
+def test_same_as_diff_ontos(tmp_path):
+    om = OntoManager(base)
+    base_only, _, other_only = om.diff_ontos(other)
+
+    om.diff_to_file(other, tmp_path / "diff.jsonl")
+    records = [json.loads(line) for line in (tmp_path / "diff.jsonl").read_text().splitlines()]
+    assert sorted(r["entry"][0] for r in records if r["diff"] == "base_only") == sorted(e[0] for _, e in base_only)
+    assert sorted(r["entry"][0] for r in records if r["diff"] == "other_only") == sorted(e[0] for _, e in other_only)
@@ -0,0 +1,44 @@
+# coding: utf8
+import json
+from pathlib import Path
+
+from leavedonto import OntoManager, instrumentation
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def test_merge_phases(tmp_path):
+    instrumentation.reset()
+    with instrumentation.profile(out_file=tmp_path / "merge.prof"):
+        om = OntoManager(resources / "test_onto_freq.yaml")
+        om.merge_to_onto(resources / "test_onto_freq2.yaml")
+        om.onto1.convert2yaml(tmp_path / "merged.yaml")
+    assert not instrumentation.enabled
+
+    instrumentation.dump(tmp_path / "report.json")
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    for name in ["load.parse", "load.trie", "cleanup", "merge.diff", "merge.insert", "merge.cleanup",
+                 "trie_to_dicts", "yaml.dump", "yaml.write"]:
+        assert report["phases"][name]["calls"] >= 1
+    assert report["counters"]["find_entries"] >= 1
+    assert "cumulative" in report["profile"]
+    assert (tmp_path / "merge.prof").is_file()
+
+
+def test_disabled():
+    instrumentation.disable()
+    instrumentation.reset()
+    OntoManager(resources / "test_onto_freq.yaml")
+    assert instrumentation.report() == {"phases": {}, "counters": {}}
+
+
+def test_tag_phases(tmp_path):
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        om = OntoManager(resources / "test_onto_freq.yaml")
+        fields = {"pos": ["NOUN", "VERB"], "levels": ["A0", "A1", "A2"], "l_colors": [], "level": "A2"}
+        om.tag_segmented(resources / "text1_segmented.txt", out_file=tmp_path / "text1_totag.xlsx", fields=fields)
+    finally:
+        instrumentation.disable()
+    assert instrumentation.report()["phases"]["tag.generate_to_tag"]["calls"] == 1
@@ -0,0 +1,48 @@
+# coding: utf8
+from pathlib import Path
+
+from leavedonto import OntoManager
+from leavedonto.origins import Origins
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def test_parse_and_format():
+    origins = Origins.parse("text2:5 — text1:3")
+    assert origins == {"text1": 3, "text2": 5}
+    assert origins.freq == 8
+    assert str(origins) == "text2:5 — text1:3"
+    assert str(origins + "text2:1 — text3:2") == "text1:3 — text2:6 — text3:2"
+    assert Origins.parse("") == {} and str(Origins()) == ""
+
+
+def test_load_export_keeps_origins():
+    om = OntoManager()
+    om.onto1.ont.legend = ["word", "POS", "level", "freq", "origin"]
+    om.onto1.ont.add(["NOUN"], ["ཁྱི་", "NOUN", "A0", 3, "text2:1 — text1:2"])
+    om.onto1.ont.add(["NOUN"], ["རྟ་", "NOUN", "A0", 1, "text1"])
+    om.onto1._cleanup()
+    assert om.onto1.find_word("རྟ་")[0][1][0][4] == {"text1": None}
+    exported = om.onto1.export_yaml_str()
+    assert "- [ཁྱི་, NOUN, A0, 3, text2:1 — text1:2]" in exported
+    assert "- [རྟ་, NOUN, A0, 1, text1" in exported
+
+    # only the merged origins are normalized
+    assert str(Origins.parse("text1") + "text1") == "text1"
+    assert str(Origins.parse("text2 — text1:1") + "text2:2") == "text1:1 — text2:2"
+
+
+def test_merge_keeps_on_disk_format():
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    om.merge_to_onto(resources / "test_onto_freq2.yaml")
+
+    found = om.onto1.find_word("ཁྱི་")
+    assert found[0][1] == [["ཁྱི་", "NOUN", "A0", 8, Origins(text1=3, text3=5, test=5)]]
+    assert "- [ཁྱི་, NOUN, A0, 8, test:5 — text1:3 — text3:5]" in om.onto1.export_yaml_str()
+
+
+def test_append_origin_adds_counts():
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    entry = ["ཁྱི་", "NOUN", "A0", 3, Origins(text1=3)]
+    om.onto1.set_field_value(entry, "origin", "text1:2 — text2:1")
+    assert entry[4] == Origins(text1=5, text2=1)
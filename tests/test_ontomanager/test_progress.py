@@ -0,0 +1,47 @@
+# coding: utf8
+import shutil
+from pathlib import Path
+
+from leavedonto import OntoManager
+from leavedonto.progress import Progress, StderrProgress
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+class Recorder(Progress):
+    def __init__(self):
+        super().__init__(interval=0)
+        self.reports = []
+
+    def report(self, metrics):
+        self.reports.append(metrics)
+
+
+def test_batch_merge_progress(tmp_path):
+    for onto in ["test_onto_freq.yaml", "test_onto_freq2.yaml"]:
+        shutil.copy(resources / onto, tmp_path / onto)
+
+    progress = Recorder()
+    om = OntoManager()
+    om.batch_merge_to_onto(tmp_path, progress=progress)
+
+    done = progress.reports[-1]
+    assert done["done"] and done["phase"] == "merge"
+    assert (done["items"], done["total"]) == (2, 2)
+    assert done["entries"] > 0
+    assert done["peak_trie_size"] == om.onto1.ont.size()
+    assert progress.reports[0]["eta"] is not None and progress.reports[1]["eta"] == 0
+
+
+def test_export_progress(capsys, tmp_path):
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    om.onto1.convert2yaml(tmp_path / "onto.yaml", progress=StderrProgress())
+    assert "export: 3/3 items, 5 entries" in capsys.readouterr().err
+
+    om.onto1.convert2yaml(tmp_path / "onto.yaml", progress=Progress())
+    assert not capsys.readouterr().err
+
+    # silent by default
+    om.onto1.convert2yaml(tmp_path / "onto.yaml")
+    om.onto1.convert2xlsx(tmp_path)
+    assert not capsys.readouterr().err
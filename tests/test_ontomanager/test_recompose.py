@@ -0,0 +1,26 @@
+# coding: utf8
+import shutil
+from pathlib import Path
+
+from leavedonto import OntoManager, LeavedOnto
+from leavedonto.origins import Origins
+
+resources = Path(__file__).parent.parent / "resources"
+
+
+def test_recompose_ontos_from_master(tmp_path):
+    master = tmp_path / "master_onto.yaml"
+    shutil.copy(resources / "test_onto_freq.yaml", master)
+    for onto in ["A0/text1.yaml", "A0/text2.yaml", "A1/text3.yaml", "A0.yaml", "A1.yaml"]:
+        (tmp_path / onto).parent.mkdir(exist_ok=True)
+        (tmp_path / onto).write_text("legend: []\nont: {}\n")
+
+    om = OntoManager(master)
+    om.recompose_ontos_from_master(workers=2)
+
+    text2 = LeavedOnto(tmp_path / "A0" / "text2_updated.yaml")
+    assert text2.find_word("རྟ་") == [(["NOUN", "animals"], [["རྟ་", "NOUN", "A1", 5, Origins()]])]
+
+    level = LeavedOnto(tmp_path / "A0_updated.yaml")
+    assert level.find_word("འགྲོ་") == [(["VERB", "action"], [["འགྲོ་", "VERB", "A0", 20, Origins(text1=15, text2=5)]])]
+    assert not LeavedOnto(tmp_path / "A1_updated.yaml").ont.find_entries()
@@ -0,0 +1,16 @@
+# coding: utf8
+from tibetan_sort import TibetanSort
+
+from leavedonto.sort_bo_lists import SortBoLists, bo_sort_key
+
+
+def test_keys_follow_tibetan_order():
+    words = ["ཁ་", "ཀ་ཁ་", "ཀ་", "བསྐྱེད་", "སྐྱེད་", "ཀ", "ཨ་", "lemma2", "lemma1", ""]
+    expected = TibetanSort().sort_list(words)
+    assert sorted(words, key=bo_sort_key) == expected
+
+
+def test_sort_list_of_lists():
+    entries = [["ཁ་", "n"], ["ཀ་", "v", "—"], ["ཀ་", "n"]]
+    sorted_ = SortBoLists().sort_list_of_lists(entries)
+    assert sorted_ == [["ཀ་", "n"], ["ཀ་", "v", "—"], ["ཁ་", "n"]]
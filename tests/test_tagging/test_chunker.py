@@ -0,0 +1,38 @@
+# coding: utf8
+from leavedonto.chunker import iter_lines, iter_chunks, count_chunks, index_chunks, iter_rows
+
+
+def test_iter_chunks(tmp_path):
+    in_file = tmp_path / "text.txt"
+    lines = [f"w{n} x{n}" for n in range(10)]
+    in_file.write_text("﻿\n" + "\n".join(lines[:5]) + "\n\n" + "\n".join(lines[5:]) + "\n\n", encoding="utf-8")
+
+    assert len(list(iter_lines(in_file))) == 11
+    assert count_chunks(in_file, "sentence") == 3
+
+    chunks = list(iter_chunks(in_file, "sentence"))
+    assert [c for c, _ in chunks] == [0, 1, 2]
+    assert chunks[1][1] == [["w4", "x4"], [""], ["w5", "x5"], ["w6", "x6"]]
+    assert list(iter_chunks(in_file, "sentence", start=1)) == chunks[1:]
+    assert list(iter_chunks(in_file, "chunk", start=1)) == []
+
+    # resuming at the offset of a chunk reads nothing before it
+    offsets = index_chunks(in_file, "sentence")
+    assert len(offsets) == 3
+    for start in range(3):
+        assert list(iter_chunks(in_file, "sentence", start=start, offset=offsets[start])) == chunks[start:]
+
+    # a chunk starting with an empty line keeps it
+    in_file.write_text("\n".join(lines[:4]) + "\n\n" + "\n".join(lines[4:]), encoding="utf-8")
+    offsets = index_chunks(in_file, "sentence")
+    resumed = list(iter_chunks(in_file, "sentence", start=1, offset=offsets[1]))
+    assert resumed[0][1][0] == [""]
+    assert resumed == list(iter_chunks(in_file, "sentence"))[1:]
+
+
+def test_iter_rows():
+    lines = [[f"w{n}"] for n in range(30)]
+    rows = list(iter_rows(lines, "chunk"))
+    assert [len(r) for r in rows] == [12, 12, 6]
+    assert rows[1][0] == "w12"
+    assert list(iter_rows(lines[:2], "sentence")) == [["w0"], ["w1"]]
@@ -0,0 +1,28 @@
+# coding: utf8
+from openpyxl import Workbook, load_workbook
+
+from leavedonto.dataval import DataVal, coalesce
+
+
+def test_coalesce():
+    cells = {(2, c) for c in range(1, 13)} | {(6, c) for c in range(1, 13)} | {(7, c) for c in range(1, 13)}
+    cells |= {(10, 1), (10, 3)}
+    assert sorted(coalesce(cells)) == ["A10", "A2:L2", "A6:L7", "C10"]
+
+
+def test_validators_attached_once_per_sheet(tmp_path):
+    wb = Workbook()
+    dv = DataVal(wb)
+    dv.add_validator("POS", ["NOUN", "VERB"])
+    dv.add_val_to_cells("POS", "Sheet", [(2, c) for c in range(1, 14)])
+    dv.add_val_to_row("POS", "Sheet", 6)
+    dv.add_val_to_cell("POS", "Sheet", idx="A10")
+
+    validations = wb["Sheet"].data_validations.dataValidation
+    assert len(validations) == 1
+    assert str(validations[0].sqref) == "A2:M2 A6 A10"
+
+    # the validation is in the sheet as soon as it is added
+    wb.save(tmp_path / "validated.xlsx")
+    validations = load_workbook(tmp_path / "validated.xlsx")["Sheet"].data_validations.dataValidation
+    assert str(validations[0].sqref) == "A2:M2 A6 A10"
@@ -0,0 +1,39 @@
+# coding: utf8
+import shutil
+from pathlib import Path
+
+from leavedonto import OntoManager, LeavedOnto
+from leavedonto.tag_to_onto import get_entries, tagged_to_trie
+
+resources = Path(__file__).parent.parent / "resources"
+fields = {"pos": ["NOUN", "VERB"], "levels": ["A0", "A1", "A2"], "l_colors": [], "level": "A2"}
+
+
+def test_get_entries(tmp_path):
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    om.tag_segmented(resources / "text1_segmented.txt", out_file=tmp_path / "text1_totag.xlsx", fields=fields)
+
+    # བྱ་ is new: its POS is left empty
+    tagged = get_entries(tmp_path / "text1_totag.xlsx")
+    assert sorted(tagged) == [("ཁྱི་", "NOUN", "A0", 3), ("ཟ་", "VERB", "A1", 1), ("འགྲོ་", "VERB", "A0", 2)]
+
+
+def test_onto_from_tagged_batch(tmp_path):
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    om.tag_segmented(resources / "text1_segmented.txt", out_file=tmp_path / "text1_totag.xlsx", fields=fields)
+    shutil.copy(tmp_path / "text1_totag.xlsx", tmp_path / "text2_totag.xlsx")
+
+    om.onto_from_tagged_batch(tmp_path, tmp_path / "level_onto.yaml", workers=2)
+    onto = LeavedOnto(tmp_path / "level_onto.yaml")
+    assert onto.find_word("ཁྱི་")[0] == (["NOUN", "animals"], [["ཁྱི་", "NOUN", "A0", 6, {}]])
+
+
+def test_tagged_to_trie():
+    basis = LeavedOnto(resources / "test_onto_freq.yaml")
+    tagged = [("རྟ་", "NOUN", "A1", 2), ("བྱ་", "NOUN", "A2", 1), ("རྟ་", "VERB", "A2", 1)]
+    trie = tagged_to_trie(tagged, basis)
+    assert sorted(trie.find_entries(lemma="རྟ་")) == [
+        (["NOUN", "animals"], [["རྟ་", "NOUN", "A1", 2, ""]]),
+        (["VERB", "to_organize"], [["རྟ་", "VERB", "A2", 1, ""]]),
+    ]
+    assert trie.find_entries(lemma="བྱ་")[0][0] == ["NOUN", "to_organize"]
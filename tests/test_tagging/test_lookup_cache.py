@@ -0,0 +1,44 @@
+# coding: utf8
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from leavedonto import OntoManager
+from leavedonto.lookup_cache import LookupCache
+
+resources = Path(__file__).parent.parent / "resources"
+fields = {"pos": ["NOUN", "VERB"], "levels": ["A0", "A1", "A2"], "l_colors": [], "level": "A2"}
+
+
+def test_lookup_cache():
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    cache = LookupCache(om.onto1)
+    assert cache.lookup("ཁྱི་") == ("NOUN", "A0")
+    assert cache.lookup("ཁྱི་") == ("NOUN", "A0")
+    assert cache.lookup("བྱ་") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_tag_segmented_with_shared_cache(tmp_path):
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    cache = LookupCache(om.onto1)
+    out_file = tmp_path / "text1_totag.xlsx"
+    om.tag_segmented(resources / "text1_segmented.txt", out_file=out_file, fields=dict(fields), cache=cache)
+
+    assert cache.stats() == {"words": 7, "types": 4, "hits": 3, "misses": 4, "hit_rate": 3 / 7}
+    ws = load_workbook(out_file).active
+    assert [ws.cell(1, c).value for c in range(1, 5)] == ["ཁྱི་", "འགྲོ་", "ཁྱི་", "ཟ་"]
+    assert [ws.cell(2, c).value for c in range(1, 5)] == ["NOUN", "VERB", "NOUN", "VERB"]
+    assert [ws.cell(7, c).value for c in range(1, 4)] == ["A0", "A2", "A0"]
+
+
+def test_tag_segmented_offers_similar(tmp_path):
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    in_file = tmp_path / "text3_segmented.txt"
+    in_file.write_text("ཁྱི ཟ་ བྱ་\n", encoding="utf-8")
+    out_file = tmp_path / "text3_totag.xlsx"
+    om.tag_segmented(in_file, out_file=out_file, fields=dict(fields), similar=1)
+
+    ws = load_workbook(out_file).active
+    assert ws.cell(1, 1).comment.text == "similar: ཁྱི་"
+    assert ws.cell(1, 2).comment is None and ws.cell(1, 3).comment is None
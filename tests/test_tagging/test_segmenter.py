@@ -0,0 +1,35 @@
+# coding: utf8
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from leavedonto import OntoManager, LeavedOnto
+from leavedonto.segmenter import SyllableMatcher
+
+resources = Path(__file__).parent.parent / "resources"
+fields = {"pos": ["NOUN", "VERB"], "levels": ["A0", "A1", "A2"], "l_colors": [], "level": "A2"}
+
+
+def test_longest_match():
+    onto = LeavedOnto(resources / "test_onto_freq.yaml")
+    onto.ont.add(["NOUN", "objects"], ["ཁྱི་རྟ་", "NOUN", "A2", 1, ""])
+    matcher = SyllableMatcher(onto)
+
+    assert matcher.segment("ཁྱི་རྟ་འགྲོ། ཁྱི་ཀཀ་") == [
+        ("ཁྱི་རྟ་", "NOUN", "A2"),
+        ("འགྲོ", "VERB", "A0"),
+        ("།", None, None),
+        ("ཁྱི་", "NOUN", "A0"),
+        ("ཀཀ་", None, None),
+    ]
+
+
+def test_tag_raw(tmp_path):
+    in_file = tmp_path / "text4.txt"
+    in_file.write_text("ཁྱི་འགྲོ། ཁྱི་ཟ།\nབྱ་འགྲོ།\n", encoding="utf-8")
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    om.tag_raw(in_file, fields=fields)
+
+    assert (tmp_path / "text4_segmented.txt").read_text(encoding="utf-8") == "ཁྱི་ འགྲོ ། ཁྱི་ ཟ །\nབྱ་ འགྲོ །\n"
+    ws = load_workbook(tmp_path / "text4_totag.xlsx").active
+    assert [ws.cell(2, c).value for c in range(1, 7)] == ["NOUN", "VERB", None, "NOUN", "VERB", None]
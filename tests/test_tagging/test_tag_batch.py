@@ -0,0 +1,28 @@
+# coding: utf8
+import shutil
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from leavedonto import OntoManager
+
+resources = Path(__file__).parent.parent / "resources"
+fields = {"pos": ["NOUN", "VERB"], "levels": ["A0", "A1", "A2"], "l_colors": [], "level": "A2"}
+
+
+def test_tag_segmented_batch(tmp_path):
+    in_dir, out_dir = tmp_path / "texts", tmp_path / "totag"
+    in_dir.mkdir()
+    for name in ["text1", "text2", "text3"]:
+        shutil.copy(resources / "text1_segmented.txt", in_dir / f"{name}.txt")
+
+    om = OntoManager(resources / "test_onto_freq.yaml")
+    processed = om.tag_segmented_batch(in_dir, out_dir, workers=2, fields=fields)
+    assert sorted(f.name for f, _, _ in processed) == ["text1.txt", "text2.txt", "text3.txt"]
+    assert all(words == 7 for _, words, _ in processed)
+
+    ws = load_workbook(out_dir / "text2_totag.xlsx").active
+    assert [ws.cell(2, c).value for c in range(1, 5)] == ["NOUN", "VERB", "NOUN", "VERB"]
+
+    # outputs more recent than their texts are skipped
+    assert om.tag_segmented_batch(in_dir, out_dir, workers=2, fields=fields) == []
@@ -0,0 +1,35 @@
+# coding: utf8
+import json
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from leavedonto import OntoManager
+
+resources = Path(__file__).parent.parent / "resources"
+fields = {"pos": ["NOUN", "VERB"], "levels": ["A0", "A1", "A2"], "l_colors": [], "level": "A2"}
+
+
+def test_tag_segmented_chunks(tmp_path):
+    in_file = tmp_path / "text2.txt"
+    in_file.write_text("\n".join(["ཁྱི་ འགྲོ་ བྱ་ ཟ་"] * 10), encoding="utf-8")
+    out_file = tmp_path / "text2_totag.xlsx"
+    om = OntoManager(resources / "test_onto_freq.yaml")
+
+    calls = 1
+    while om.tag_segmented_chunks(in_file, out_file, line_mode="sentence", fields=dict(fields)):
+        # parts are written, the sheet is only built once all chunks are done
+        assert not out_file.is_file()
+        calls += 1
+    assert calls == 3
+
+    manifest = json.loads((tmp_path / "text2.manifest.json").read_text())
+    assert manifest["chunks"] == {"0": "done", "1": "done", "2": "done"}
+    assert manifest["offsets"] == [0, 4 * 46, 8 * 46]  # bytes of 4 lines per chunk
+    assert len(list((tmp_path / "text2_parts").glob("*.json"))) == 3
+
+    ws = load_workbook(out_file).active
+    assert ws.cell(16, 1).value == "chunk 1"
+    assert ws.cell(16, 2).value == "line 5"
+    assert [ws.cell(18, c).value for c in range(1, 5)] == ["NOUN", "VERB", None, "VERB"]
+    assert ws.cell(19, 3).value == "A2"